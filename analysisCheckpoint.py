@@ -0,0 +1,55 @@
+import dataclasses
+import json
+import os
+from dataclasses import dataclass, field
+
+from clipExtractor import ClipWindow
+from clipSegments import ClipSegmentEntry
+from eventPrinter import get_event_data, get_event_record
+
+
+@dataclass
+class AnalysisCheckpoint:
+    # the next step of analysis compares the frame at frame_index with the one after it
+    frame_index: int
+    frames_count: int
+    events_file_size: int
+    machine_state: dict
+    events: list = field(default_factory=list)
+    clip_windows: list = field(default_factory=list)
+    clip_segments: list = field(default_factory=list)
+
+
+def get_checkpoint_path(video_name):
+    return "out\\" + video_name + "\\checkpoint.json"
+
+
+def save_checkpoint(checkpoint, path):
+    checkpoint_data = dataclasses.asdict(checkpoint)
+    checkpoint_data["events"] = [get_event_data(event) for event in checkpoint.events]
+
+    # the previous checkpoint is replaced only by a complete one, so the process can be killed at any moment
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(checkpoint_data, checkpoint_file)
+
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    if not os.path.isfile(path):
+        return None
+
+    with open(path) as checkpoint_file:
+        checkpoint_data = json.load(checkpoint_file)
+
+    checkpoint = AnalysisCheckpoint(**checkpoint_data)
+    checkpoint.events = [get_event_record(event_data) for event_data in checkpoint.events]
+    checkpoint.clip_windows = [ClipWindow(**clip_window) for clip_window in checkpoint.clip_windows]
+    checkpoint.clip_segments = [ClipSegmentEntry(**entry) for entry in checkpoint.clip_segments]
+    return checkpoint
+
+
+def remove_checkpoint(path):
+    if os.path.isfile(path):
+        os.remove(path)
@@ -0,0 +1,113 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from detectorProcesses import process_video_with_detector_processes
+from multiStreamEngine import run_multi_stream_engine
+from segmentRunner import process_video_in_segments
+from videoProcessor import ProcessingOptions, initialize_worker, process_video
+
+
+def find_video_paths(video_catalogue_path):
+    video_paths = []
+
+    for file in sorted(os.listdir(video_catalogue_path)):
+        if file.endswith(".mp4"):
+            video_paths.append(video_catalogue_path + "/" + file)
+
+    return video_paths
+
+
+def get_workers_count(requested_workers_count, videos_count):
+    workers_count = requested_workers_count if requested_workers_count > 0 else os.cpu_count() or 1
+    return max(1, min(workers_count, videos_count))
+
+
+def run_batch(video_paths, workers_count=1, segments_count=1, options=None, result_cache=None, multi_stream=False):
+    options = options or ProcessingOptions()
+    start_time = time.perf_counter()
+
+    # unchanged videos keep their events and clips from an earlier run
+    cached_summaries = []
+    if result_cache is not None:
+        cached_summaries = [summary for summary in map(result_cache.get_summary, video_paths) if summary is not None]
+
+    cached_video_paths = [summary.video_path for summary in cached_summaries]
+    new_video_paths = [video_path for video_path in video_paths if video_path not in cached_video_paths]
+    if multi_stream and new_video_paths:
+        new_summaries = run_multi_stream_engine(new_video_paths, options)
+    else:
+        new_summaries = process_videos(new_video_paths, workers_count, segments_count, options)
+
+    if result_cache is not None:
+        for summary in new_summaries:
+            result_cache.add_summary(summary)
+
+        result_cache.save()
+        result_cache.print_report()
+
+    summaries = sorted(cached_summaries + new_summaries, key=lambda summary: video_paths.index(summary.video_path))
+    return summaries, time.perf_counter() - start_time
+
+
+def process_videos(video_paths, workers_count=1, segments_count=1, options=None):
+    summaries = []
+
+    if not video_paths:
+        return summaries
+
+    if segments_count > 1:
+        # a single video already uses all workers, so videos are processed one after another
+        for video_path in video_paths:
+            summaries.append(process_video_in_segments(video_path, segments_count, workers_count, options))
+
+        return summaries
+
+    if options is not None and options.detector_processes > 0:
+        # detectors of a single video already run in several processes
+        for video_path in video_paths:
+            summaries.append(process_video_with_detector_processes(video_path, options))
+
+        return summaries
+
+    workers_count = get_workers_count(workers_count, len(video_paths))
+
+    if workers_count == 1:
+        for video_path in video_paths:
+            summaries.append(process_video(video_path, options))
+    else:
+        # every video gets its own state machine and event writer inside a worker process
+        with ProcessPoolExecutor(max_workers=workers_count, initializer=initialize_worker) as executor:
+            futures = [executor.submit(process_video, video_path, options) for video_path in video_paths]
+
+            for future in as_completed(futures):
+                summaries.append(future.result())
+
+        summaries.sort(key=lambda summary: video_paths.index(summary.video_path))
+
+    return summaries
+
+
+def print_batch_summary(summaries, wall_time):
+    # frames reused from the result cache are not analysed, so they are left out of the speed
+    frames_count = sum(summary.frames_count for summary in summaries if not summary.is_cached)
+    events_count = sum(summary.events_count for summary in summaries)
+
+    print("Batch summary:")
+    for summary in summaries:
+        if summary.is_cached:
+            print("  " + summary.video_name + ": " + str(summary.frames_count) + " frames, "
+                  + str(summary.events_count) + " events, reused from the result cache")
+            continue
+
+        print("  " + summary.video_name + ": " + str(summary.frames_count) + " frames, "
+              + str(round(summary.wall_time, 2)) + "s, "
+              + str(round(summary.get_frames_per_second(), 2)) + " frames/s, "
+              + str(summary.events_count) + " events, "
+              + str(round(summary.history_memory_used / 2 ** 20, 1)) + " MB clip history")
+
+    frames_per_second = frames_count / wall_time if wall_time > 0 else 0.0
+    print("  total: " + str(len(summaries)) + " videos, " + str(frames_count) + " frames, "
+          + str(round(wall_time, 2)) + "s wall time, "
+          + str(round(frames_per_second, 2)) + " frames/s, "
+          + str(events_count) + " events")
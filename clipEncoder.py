@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+import videoExtensions
+
+
+@dataclass
+class EncodedClip:
+    video_path: str
+    frames_count: int
+    queue_time: float
+    encode_time: float
+
+    def get_latency(self):
+        return self.queue_time + self.encode_time
+
+
+class ClipEncoder:
+    # cv2.VideoWriter releases the GIL while encoding, so threads are enough to overlap it with analysis
+    def __init__(self, workers_count=2, queue_size=4):
+        self.tasks = queue.Queue(maxsize=queue_size)
+        self.encoded_clips = []
+        self.encoded_clips_lock = threading.Lock()
+        self.submit_stall_time = 0.0
+        self.error = None
+        self.workers = []
+
+        for i in range(workers_count):
+            worker = threading.Thread(target=self.encode_clips, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, frames, video_path, resolution):
+        # blocks while the queue is full, so analysis can not run away from encoding
+        submit_time = time.perf_counter()
+        self.tasks.put((frames, video_path, resolution, submit_time))
+        self.submit_stall_time += time.perf_counter() - submit_time
+
+    def encode_clips(self):
+        while True:
+            task = self.tasks.get()
+
+            if task is None:
+                self.tasks.task_done()
+                return
+
+            frames, video_path, resolution, submit_time = task
+            start_time = time.perf_counter()
+
+            # a failed clip is still marked as done, so waiting for the queue can not block forever
+            try:
+                videoExtensions.save_video_event(frames, video_path, resolution)
+                end_time = time.perf_counter()
+
+                with self.encoded_clips_lock:
+                    self.encoded_clips.append(EncodedClip(video_path, len(frames), start_time - submit_time,
+                                                          end_time - start_time))
+            except Exception as error:
+                with self.encoded_clips_lock:
+                    self.error = self.error or error
+            finally:
+                self.tasks.task_done()
+
+    def raise_error(self):
+        # the first error of the workers is raised on the analysis thread
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        self.tasks.join()
+        self.raise_error()
+
+    def close(self):
+        self.tasks.join()
+
+        for worker in self.workers:
+            self.tasks.put(None)
+
+        for worker in self.workers:
+            worker.join()
+
+        self.workers = []
+        self.raise_error()
+
+    def print_report(self):
+        for clip in self.encoded_clips:
+            print("  clip " + clip.video_path + ": " + str(clip.frames_count) + " frames encoded in "
+                  + str(round(clip.encode_time * 1000, 1)) + " ms, "
+                  + str(round(clip.get_latency() * 1000, 1)) + " ms after request")
+
+        print("  analysis waited " + str(round(self.submit_stall_time, 2)) + "s for free places in the clip queue")
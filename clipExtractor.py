@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+
+import cv2
+
+import videoExtensions
+
+# gaps between clips longer than this are skipped by seeking instead of grabbing every frame
+MAX_GRABBED_GAP_FRAMES = 300
+
+
+@dataclass
+class ClipWindow:
+    video_path: str
+    start: int
+    stop: int
+
+
+def extract_event_clips(source_video_path, clip_windows, resolution):
+    pending_windows = sorted(clip_windows, key=lambda window: window.start)
+
+    # clips without frames are still written, the same way as clips saved during analysis
+    for window in [window for window in pending_windows if window.start >= window.stop]:
+        videoExtensions.save_video_event([], window.video_path, resolution)
+        pending_windows.remove(window)
+
+    if not pending_windows:
+        return
+
+    video = cv2.VideoCapture(source_video_path)
+    video.set(cv2.CAP_PROP_POS_FRAMES, pending_windows[0].start)
+    frame_index = pending_windows[0].start
+    active_clips = []
+
+    while pending_windows or active_clips:
+        while pending_windows and pending_windows[0].start == frame_index:
+            window = pending_windows.pop(0)
+            active_clips.append((window, cv2.VideoWriter(window.video_path, videoExtensions.FOURCC, 60, resolution)))
+
+        if not active_clips:
+            next_start = pending_windows[0].start
+            if next_start - frame_index > MAX_GRABBED_GAP_FRAMES:
+                video.set(cv2.CAP_PROP_POS_FRAMES, next_start)
+                frame_index = next_start
+                continue
+
+            if not video.grab():
+                break
+
+            frame_index += 1
+            continue
+
+        is_read, frame = video.read()
+        if not is_read:
+            break
+
+        for window, writer in active_clips:
+            writer.write(frame)
+
+        frame_index += 1
+
+        for window, writer in [clip for clip in active_clips if clip[0].stop == frame_index]:
+            writer.release()
+            active_clips.remove((window, writer))
+
+    for window, writer in active_clips:
+        writer.release()
+
+    video.release()
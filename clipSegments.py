@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+from dataclasses import dataclass
+
+import cv2
+
+import clipExtractor
+from clipExtractor import ClipWindow
+
+# clips and segments are written with this frame rate, times of the index are computed from it
+CLIP_FRAME_RATE = 60
+
+
+@dataclass
+class ClipSegmentEntry:
+    # the clip of an event is the range of frames from start to stop of a merged segment
+    event_id: str
+    segment_path: str
+    start: int
+    stop: int
+
+
+def get_clip_index_path(video_name):
+    return "out\\" + video_name + "\\clips.json"
+
+
+def get_segment_path(video_name, first_event_id):
+    return "out\\" + video_name + "\\clips_" + str(first_event_id) + ".mp4"
+
+
+def save_clip_index(clip_segments, path):
+    clip_index = {entry.event_id: {"segment": entry.segment_path, "start_frame": entry.start, "stop_frame": entry.stop,
+                                   "start_time": entry.start / CLIP_FRAME_RATE, "stop_time": entry.stop / CLIP_FRAME_RATE}
+                  for entry in clip_segments}
+
+    with open(path, "w") as index_file:
+        json.dump(clip_index, index_file, indent=1)
+
+
+def load_clip_index(path):
+    if not os.path.isfile(path):
+        return {}
+
+    with open(path) as index_file:
+        clip_index = json.load(index_file)
+
+    return {event_id: ClipSegmentEntry(event_id, data["segment"], data["start_frame"], data["stop_frame"])
+            for event_id, data in clip_index.items()}
+
+
+def export_event_clips(video_name, event_ids=None):
+    # clips of single events are cut from merged segments, every segment is read once
+    clip_index = load_clip_index(get_clip_index_path(video_name))
+    windows_by_segment = {}
+
+    for event_id, entry in clip_index.items():
+        if event_ids is None or event_id in event_ids:
+            clip_path = "out\\" + video_name + "\\" + event_id + ".mp4"
+            windows_by_segment.setdefault(entry.segment_path, []).append(ClipWindow(clip_path, entry.start, entry.stop))
+
+    for segment_path, clip_windows in windows_by_segment.items():
+        segment = cv2.VideoCapture(segment_path)
+        resolution = (int(segment.get(cv2.CAP_PROP_FRAME_WIDTH)), int(segment.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        segment.release()
+        clipExtractor.extract_event_clips(segment_path, clip_windows, resolution)
+
+    return sum(len(clip_windows) for clip_windows in windows_by_segment.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export clips of single events from segments written with --merge-clips.")
+    parser.add_argument("video_names", nargs="+", help="names of analysed videos in out")
+    parser.add_argument("--events", nargs="*", default=None, metavar="EVENT_ID",
+                        help="ids of exported events, all events are exported by default")
+    args = parser.parse_args()
+
+    for video_name in args.video_names:
+        exported_count = export_event_clips(video_name, args.events)
+        print(video_name + ": " + str(exported_count) + " clips exported")
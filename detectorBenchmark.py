@@ -0,0 +1,169 @@
+import argparse
+import io
+import json
+import os
+import time
+
+import cv2
+
+import sessionGenerator
+import videoExtensions
+from frameLayout import FrameLayout
+from videoStateMachine import VideoStateMachine
+
+# seconds of the synthetic session whose frame pairs are given to detectors
+BENCHMARK_SCENES = {
+    "idle": 0.5,
+    "player": 1.5,
+    "playing": 4.0,
+    "loading_popup": 8.0,
+    "url_change": sessionGenerator.URL_CHANGE_TIME,
+    "full_screen_toggle": sessionGenerator.FULL_SCREEN_TOGGLE_TIME,
+}
+
+# scale of the cheaper player search, timed next to the full one
+PLAYER_SEARCH_SCALE = 0.25
+
+
+def get_scene_frame_pairs(resolution, fps):
+    scene_indexes = {scene: max(1, int(scene_time * fps)) for scene, scene_time in BENCHMARK_SCENES.items()}
+    wanted_indexes = set(scene_indexes.values()) | set(index - 1 for index in scene_indexes.values())
+    frames = {}
+
+    for frame_index, frame in enumerate(sessionGenerator.render_session_frames(resolution, fps)):
+        if frame_index in wanted_indexes:
+            frames[frame_index] = frame
+
+    return {scene: (frames[index - 1], frames[index]) for scene, index in scene_indexes.items()}
+
+
+def get_detectors(layout, video_contour):
+    # every detector gets a new frame context, so scaling and shared conversions are part of its cost
+    def new_context(frame_pair):
+        return videoExtensions.FrameContext(frame_pair[0], frame_pair[1], layout)
+
+    analysis_width, analysis_height = layout.analysis_resolution
+    return {
+        "gray_diff": lambda frame_pair: new_context(frame_pair).get_gray_diff(),
+        "find_biggest_contour": lambda frame_pair: new_context(frame_pair).find_biggest_contour(),
+        "find_biggest_contour_scaled": lambda frame_pair: new_context(frame_pair).find_biggest_contour(PLAYER_SEARCH_SCALE),
+        "is_player_in_place": lambda frame_pair: new_context(frame_pair).is_player_in_place(video_contour),
+        "is_video_initializing": lambda frame_pair: new_context(frame_pair).is_video_initializing(video_contour),
+        "is_video_playing": lambda frame_pair: new_context(frame_pair).is_video_playing(video_contour),
+        "is_loading_popup_visible": lambda frame_pair: new_context(frame_pair).is_loading_popup_visible(video_contour, 0),
+        "has_url_bar_changed": lambda frame_pair: new_context(frame_pair).has_url_bar_changed(),
+        "is_full_screen_toggled": lambda frame_pair: new_context(frame_pair).is_full_screen_toggled(),
+        "find_bottom_scroll_bar_point":
+            lambda frame_pair: videoExtensions.find_bottom_scroll_bar_point(new_context(frame_pair).get_previous_analysis_frame(),
+                                                                            analysis_height, analysis_width),
+    }
+
+
+def time_call(function, argument, repeats):
+    start_time = time.perf_counter()
+
+    for i in range(repeats):
+        function(argument)
+
+    return (time.perf_counter() - start_time) / repeats
+
+
+def benchmark_detectors(resolution, fps, repeats, analysis_scale=1.0):
+    layout = FrameLayout(resolution, analysis_scale)
+    frame_pairs = get_scene_frame_pairs(resolution, fps)
+    player_context = videoExtensions.FrameContext(frame_pairs["player"][0], frame_pairs["player"][1], layout)
+    video_contour = videoExtensions.simplify_contour(player_context.find_biggest_contour(),
+                                                     layout.scale_length(videoExtensions.CONTOUR_MERGE_DISTANCE))
+    results = {}
+
+    for detector_name, detector in get_detectors(layout, video_contour).items():
+        scene_times = {scene: time_call(detector, frame_pair, repeats) for scene, frame_pair in frame_pairs.items()}
+        results[detector_name] = {scene: round(scene_time * 1000, 3) for scene, scene_time in scene_times.items()}
+
+    return results
+
+
+def benchmark_state_machine(resolution, fps, analysis_scale=1.0):
+    # only the analysis is timed, rendering of the session is left out
+    stateMachine = VideoStateMachine()
+    stateMachine.initialize(resolution[0], resolution[1], "benchmark", io.StringIO(), analysis_scale=analysis_scale)
+    analysis_time = 0.0
+    frames_count = 0
+    previous_frame = None
+
+    for frame_index, frame in enumerate(sessionGenerator.render_session_frames(resolution, fps)):
+        if previous_frame is not None:
+            start_time = time.perf_counter()
+            stateMachine.run_current_state(previous_frame, frame, frame_index * 1000 / fps)
+            analysis_time += time.perf_counter() - start_time
+            frames_count += 1
+
+        previous_frame = frame
+
+    stateMachine.event_writer.flush()
+    return {"frames_count": frames_count, "events_count": stateMachine.new_event_id - 1,
+            "frames_per_second": round(frames_count / analysis_time, 2)}
+
+
+def run_benchmark(resolution=(1920, 1080), fps=30, repeats=20, analysis_scale=1.0):
+    cv2.setNumThreads(1)
+
+    return {
+        "resolution": str(resolution[0]) + "x" + str(resolution[1]),
+        "fps": fps,
+        "repeats": repeats,
+        "analysis_scale": analysis_scale,
+        "detectors_ms": benchmark_detectors(resolution, fps, repeats, analysis_scale),
+        "state_machine": benchmark_state_machine(resolution, fps, analysis_scale),
+    }
+
+
+def get_change_text(value, baseline_value, is_time=True):
+    if not baseline_value:
+        return ""
+
+    # positive change always means faster
+    change = (baseline_value / value - 1) if is_time else (value / baseline_value - 1)
+    return " (" + ("+" if change >= 0 else "") + str(round(change * 100, 1)) + "%)"
+
+
+def print_benchmark(results, baseline=None):
+    baseline_detectors = baseline["detectors_ms"] if baseline else {}
+    print("Detector benchmark at " + results["resolution"] + " scaled by " + str(results["analysis_scale"]) + ", ms per call:")
+
+    for detector_name, scene_times in results["detectors_ms"].items():
+        baseline_times = baseline_detectors.get(detector_name, {})
+        print("  " + detector_name + ": " + ", ".join(
+            scene + " " + str(scene_time) + get_change_text(scene_time, baseline_times.get(scene))
+            for scene, scene_time in scene_times.items()))
+
+    state_machine = results["state_machine"]
+    baseline_fps = baseline["state_machine"]["frames_per_second"] if baseline else None
+    print("  state machine: " + str(state_machine["frames_per_second"]) + " frames/s"
+          + get_change_text(state_machine["frames_per_second"], baseline_fps, False) + ", "
+          + str(state_machine["events_count"]) + " events")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time detectors and the state machine on a synthetic session.")
+    parser.add_argument("--resolution", type=sessionGenerator.parse_resolution, default=(1920, 1080), help="WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--repeats", type=int, default=20, help="calls of every detector on every scene")
+    parser.add_argument("--analysis-scale", type=float, default=1.0, help="scale of frames given to detectors")
+    parser.add_argument("--output", default="out\\benchmark.json", help="where results are saved")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    if not os.path.isdir("out"):
+        os.mkdir("out")
+
+    results = run_benchmark(args.resolution, args.fps, args.repeats, args.analysis_scale)
+    print_benchmark(results, baseline)
+
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=4)
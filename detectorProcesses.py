@@ -0,0 +1,324 @@
+import collections
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import videoExtensions
+from eventSinks import MemoryEventSink
+from frameLayout import FrameLayout
+from videoProcessor import ProcessingOptions, VideoSummary, configure_event_writer, configure_player_search, \
+    get_video_name, materialise_event_clips, open_events_file, print_clip_encoding_report
+from videoStateMachine import State, VideoStateMachine
+
+# frames decoded ahead of the state machine, next to the previous and the current one
+DECODED_FRAMES_AHEAD = 6
+
+# detectors of this many next steps are evaluated while the state machine still works on the current one
+DETECTOR_LOOKAHEAD_STEPS = 4
+
+# a process killed without sending its message would leave the coordinator waiting forever
+PROCESS_POLL_SECONDS = 1.0
+PROCESS_JOIN_SECONDS = 5.0
+
+# detectors independent of each other, all of them are evaluated at once for a frame of these states
+FAN_OUT_DETECTORS = {
+    State.LOADING_VIDEO: ["is_full_screen_toggled", "has_url_bar_changed", "get_loading_popup_features", "is_video_playing"],
+    State.PLAYING_VIDEO: ["is_full_screen_toggled", "has_url_bar_changed", "get_loading_popup_features"],
+    State.PAUSED_VIDEO: ["is_full_screen_toggled", "has_url_bar_changed", "get_loading_popup_features"],
+    State.SITE_CHANGED: ["get_loading_popup_features"],
+}
+PLAYER_DETECTORS = ["get_loading_popup_features", "is_video_playing"]
+DETECTOR_NAMES = FAN_OUT_DETECTORS[State.LOADING_VIDEO]
+
+
+class SharedFrameRing:
+    # frames of one video in shared memory, processes attached to it read them without copying
+    def __init__(self, frame_shape, slots_count, name=None):
+        self.memory = shared_memory.SharedMemory(name, name is None, int(np.prod(frame_shape)) * slots_count)
+        self.is_owner = name is None
+        self.frames = list(np.ndarray((slots_count,) + tuple(frame_shape), np.uint8, self.memory.buf))
+
+    def close(self):
+        # views of the memory have to be released before it is closed
+        self.frames = None
+        self.memory.close()
+
+        if self.is_owner:
+            self.memory.unlink()
+
+
+def decode_frames(video_path, ring_name, frame_shape, slots_count, free_slots, decoded_frames):
+    cv2.setNumThreads(1)
+    ring = SharedFrameRing(frame_shape, slots_count, ring_name)
+    video = cv2.VideoCapture(video_path)
+
+    try:
+        for slot in iter(free_slots.get, None):
+            is_read, frame = video.read(ring.frames[slot])
+            if is_read and frame is not ring.frames[slot]:
+                np.copyto(ring.frames[slot], frame)
+
+            decoded_frames.put((slot, is_read, video.get(cv2.CAP_PROP_POS_MSEC)))
+            if not is_read:
+                break
+    except Exception:
+        # the coordinator gets the error instead of the next frame
+        decoded_frames.put((None, False, traceback.format_exc()))
+    finally:
+        video.release()
+        ring.close()
+
+
+def evaluate_detectors(ring_name, frame_shape, slots_count, analysis_scale, tasks, results):
+    cv2.setNumThreads(1)
+    ring = SharedFrameRing(frame_shape, slots_count, ring_name)
+    layout = FrameLayout((frame_shape[1], frame_shape[0]), analysis_scale)
+    frame_context = None
+    frame_context_step = -1
+
+    for step, previous_slot, next_slot, detector_name, contour in iter(tasks.get, None):
+        # errors are sent back with the result, so the coordinator does not wait for it forever
+        try:
+            # scaled frames and buffers are shared with the context of the step before only
+            if step != frame_context_step:
+                previous_context = frame_context if step == frame_context_step + 1 else None
+                frame_context = videoExtensions.FrameContext(ring.frames[previous_slot], ring.frames[next_slot], layout,
+                                                             previous_context)
+                frame_context_step = step
+
+            detector = getattr(frame_context, detector_name)
+            results.put((step, detector_name, detector(contour) if detector_name in PLAYER_DETECTORS else detector(),
+                         None))
+        except Exception:
+            results.put((step, detector_name, None, traceback.format_exc()))
+
+    frame_context = None
+    ring.close()
+
+
+def get_process_message(message_queue, processes):
+    while True:
+        try:
+            return message_queue.get(timeout=PROCESS_POLL_SECONDS)
+        except queue.Empty:
+            if not all(process.is_alive() for process in processes):
+                raise RuntimeError("a decoder or detector process has stopped unexpectedly")
+
+
+def get_decoded_frame(decoded_frames, decoder):
+    slot, is_read, current_time = get_process_message(decoded_frames, [decoder])
+    if slot is None:
+        raise RuntimeError("decoding failed in the decoder process:\n" + current_time)
+
+    return slot, is_read, current_time
+
+
+def stop_process(process):
+    # a process may still be feeding a queue nobody reads anymore, so it is terminated after a while
+    process.join(PROCESS_JOIN_SECONDS)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+
+
+class DetectorProcesses:
+    # detectors of several steps are sent to worker processes ahead, every detector always to the same worker
+    def __init__(self, ring, processes_count, analysis_scale):
+        self.results = multiprocessing.Queue()
+        self.task_queues = [multiprocessing.Queue() for i in range(processes_count)]
+        self.workers = [multiprocessing.Process(target=evaluate_detectors, daemon=True,
+                                                args=(ring.memory.name, ring.frames[0].shape, len(ring.frames),
+                                                      analysis_scale, task_queue, self.results))
+                        for task_queue in self.task_queues]
+
+        # detectors and player contour submitted for every step, results and numbers of results still evaluated
+        self.submitted_detectors = {}
+        self.step_results = {}
+        self.pending_counts = {}
+        self.waiting_time = 0.0
+
+        for worker in self.workers:
+            worker.start()
+
+    def submit_step(self, step, previous_slot, next_slot, detector_names, player_contour):
+        contour = np.asarray(player_contour) if player_contour is not None else None
+
+        for detector_name in detector_names:
+            task_queue = self.task_queues[DETECTOR_NAMES.index(detector_name) % len(self.task_queues)]
+            task_queue.put((step, previous_slot, next_slot, detector_name,
+                            contour if detector_name in PLAYER_DETECTORS else None))
+
+        self.submitted_detectors[step] = (detector_names, player_contour)
+        self.step_results[step] = {}
+        self.pending_counts[step] = len(detector_names)
+
+    def receive_result(self):
+        start_time = time.perf_counter()
+        step, detector_name, result, error = get_process_message(self.results, self.workers)
+        self.waiting_time += time.perf_counter() - start_time
+
+        if error is not None:
+            raise RuntimeError("detector " + detector_name + " failed in a worker process:\n" + error)
+
+        self.step_results[step][detector_name] = result
+        self.pending_counts[step] -= 1
+
+    def get_result(self, step, detector_name, player_contour):
+        # results are valid whatever the state is, only the player has to be the one they were evaluated for
+        detector_names, submitted_contour = self.submitted_detectors.get(step, ([], None))
+        if detector_name not in detector_names or \
+                (detector_name in PLAYER_DETECTORS and player_contour is not submitted_contour):
+            return None
+
+        while detector_name not in self.step_results[step]:
+            self.receive_result()
+
+        return self.step_results[step][detector_name]
+
+    def release_steps(self, last_step):
+        # frames of these steps are reused only after every worker is done with them
+        while any(pending_count > 0 for step, pending_count in self.pending_counts.items() if step <= last_step):
+            self.receive_result()
+
+        for step in [step for step in self.submitted_detectors if step <= last_step]:
+            del self.submitted_detectors[step], self.step_results[step], self.pending_counts[step]
+
+    def close(self):
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+
+        for worker in self.workers:
+            stop_process(worker)
+
+
+def get_fan_out_detectors(stateMachine):
+    # detectors of steps ahead are chosen by the current state, other checks of later states are evaluated locally
+    detector_names = FAN_OUT_DETECTORS.get(stateMachine.current_state, [])
+    if stateMachine.is_full_screen:
+        detector_names = [detector_name for detector_name in detector_names if detector_name != "has_url_bar_changed"]
+
+    return detector_names
+
+
+class FanOutFrameContext(videoExtensions.FrameContext):
+    # detectors evaluated ahead by worker processes are taken from them, everything else stays in the coordinator
+    def __init__(self, previous_frame, next_frame, layout, previous_context, stateMachine, detector_processes, step):
+        super().__init__(previous_frame, next_frame, layout, previous_context)
+        self.stateMachine = stateMachine
+        self.detector_processes = detector_processes
+        self.step = step
+
+    def get_detector_result(self, detector_name, contour=None):
+        return self.detector_processes.get_result(self.step, detector_name, contour)
+
+    def has_url_bar_changed(self):
+        result = self.get_detector_result("has_url_bar_changed")
+        return result if result is not None else super().has_url_bar_changed()
+
+    def is_full_screen_toggled(self):
+        result = self.get_detector_result("is_full_screen_toggled")
+        return result if result is not None else super().is_full_screen_toggled()
+
+    def is_video_playing(self, contour):
+        result = self.get_detector_result("is_video_playing", contour)
+        return result if result is not None else super().is_video_playing(contour)
+
+    def get_loading_popup_features(self, contour):
+        result = self.get_detector_result("get_loading_popup_features", contour)
+        return result if result is not None else super().get_loading_popup_features(contour)
+
+
+def process_video_with_detector_processes(video_path, options=None):
+    options = options or ProcessingOptions()
+    video_name = get_video_name(video_path)
+    print("Work on " + video_name + " has started with " + str(options.detector_processes)
+          + " detector processes... Please don't close the application.")
+    start_time = time.perf_counter()
+
+    video = cv2.VideoCapture(video_path)
+    WIDTH = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    HEIGHT = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    video.release()
+
+    os.makedirs("out\\" + video_name, exist_ok=True)
+    event_records = MemoryEventSink()
+    stateMachine = VideoStateMachine()
+    stateMachine.initialize(WIDTH, HEIGHT, video_name, open_events_file(video_name), event_sinks=[event_records],
+                            analysis_scale=options.analysis_scale)
+    configure_player_search(stateMachine, options)
+    configure_event_writer(stateMachine.event_writer, options)
+
+    # the decoder and detector processes share frames with the state machine, only slot numbers are sent
+    ring = SharedFrameRing((HEIGHT, WIDTH, 3), DECODED_FRAMES_AHEAD + 2)
+    free_slots = multiprocessing.Queue()
+    decoded_frames = multiprocessing.Queue()
+    decoder = multiprocessing.Process(target=decode_frames, daemon=True,
+                                      args=(video_path, ring.memory.name, ring.frames[0].shape, len(ring.frames),
+                                            free_slots, decoded_frames))
+    detector_processes = None
+    frames_count = 0
+
+    # processes and shared memory are released also when analysis fails
+    try:
+        decoder.start()
+        detector_processes = DetectorProcesses(ring, options.detector_processes, options.analysis_scale)
+
+        for slot in range(len(ring.frames)):
+            free_slots.put(slot)
+
+        previous_slot, is_read, current_time = get_decoded_frame(decoded_frames, decoder)
+        frames_count = 1 if is_read else 0
+        ahead_frames = collections.deque()
+        step = 0
+
+        while True:
+            # detectors of decoded frames ahead are submitted with the state and player the state machine has now
+            while is_read and len(ahead_frames) < DETECTOR_LOOKAHEAD_STEPS:
+                ahead_slot, is_read, ahead_time = get_decoded_frame(decoded_frames, decoder)
+                if is_read:
+                    slot_before = ahead_frames[-1][0] if ahead_frames else previous_slot
+                    ahead_frames.append((ahead_slot, ahead_time))
+                    detector_processes.submit_step(step + len(ahead_frames), slot_before, ahead_slot,
+                                                   get_fan_out_detectors(stateMachine),
+                                                   stateMachine.get_current_video_contour())
+
+            if not ahead_frames:
+                break
+
+            next_slot, current_time = ahead_frames.popleft()
+            frames_count += 1
+            step += 1
+            frame_context = FanOutFrameContext(ring.frames[previous_slot], ring.frames[next_slot], stateMachine.layout,
+                                               stateMachine.frame_context, stateMachine, detector_processes, step)
+            stateMachine.run_current_state(ring.frames[previous_slot], ring.frames[next_slot], current_time, frame_context)
+            detector_processes.release_steps(step)
+
+            free_slots.put(previous_slot)
+            previous_slot = next_slot
+    finally:
+        free_slots.put(None)
+        if detector_processes is not None:
+            detector_processes.close()
+
+        stop_process(decoder)
+        stateMachine.previous_frame = stateMachine.next_frame = stateMachine.frame_context = frame_context = None
+        ring.close()
+
+    stateMachine.save_text_file()
+    event_writer = stateMachine.event_writer
+
+    materialise_event_clips(event_writer, video_path)
+    print_clip_encoding_report(event_writer)
+    print("  detector processes: coordinator waited " + str(round(detector_processes.waiting_time, 2))
+          + "s for results of " + str(options.detector_processes) + " workers")
+
+    summary = VideoSummary(video_path, video_name, frames_count, time.perf_counter() - start_time,
+                           stateMachine.new_event_id - 1, event_writer.get_history_memory_used(), event_records.events)
+    print("Work on " + video_name + " has ended.")
+    return summary
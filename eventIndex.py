@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import sqlite3
+
+from clipSegments import get_clip_index_path, load_clip_index
+from eventPrinter import EventType
+
+
+def get_clip_path(video_name, event, clip_index=None):
+    clip_path = "out\\" + video_name + "\\" + str(event.event_id) + ".mp4"
+    if os.path.isfile(clip_path):
+        return clip_path
+
+    # merged clips are found in the segment holding the event, its range is kept in the clip index
+    entry = (clip_index or {}).get(str(event.event_id))
+    return entry.segment_path if entry is not None and os.path.isfile(entry.segment_path) else None
+
+
+def get_event_rows(summary):
+    clip_index = load_clip_index(get_clip_index_path(summary.video_name))
+    return [(summary.video_name, summary.video_path, event.event_id, event.event_type.value, event.time,
+             event.title.rstrip(": "), get_clip_path(summary.video_name, event, clip_index)) for event in summary.events]
+
+
+class JsonlEventCorpus:
+    # one JSON object per event of all videos, lines of an analysed again video replace its previous ones
+    def __init__(self, path):
+        self.path = path
+        self.lines_by_video = {}
+
+        if os.path.isfile(path):
+            with open(path) as corpus_file:
+                for line in filter(str.strip, corpus_file):
+                    self.lines_by_video.setdefault(json.loads(line)["video"], []).append(line)
+
+    def add_video_events(self, summary):
+        self.lines_by_video[summary.video_name] = [
+            json.dumps({"video": video_name, "video_path": video_path, "event_id": event_id, "type": event_type,
+                        "time_ms": time_ms, "title": title, "clip_path": clip_path}) + "\n"
+            for video_name, video_path, event_id, event_type, time_ms, title, clip_path in get_event_rows(summary)]
+
+    def close(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as corpus_file:
+            for lines in self.lines_by_video.values():
+                corpus_file.write("".join(lines))
+
+        os.replace(temporary_path, self.path)
+
+
+class SqliteEventIndex:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS events (video TEXT, video_path TEXT, event_id INTEGER, "
+                                "type TEXT, time_ms REAL, title TEXT, clip_path TEXT, PRIMARY KEY (video, event_id))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS events_type_time ON events (type, time_ms)")
+
+    def add_video_events(self, summary):
+        # events of an analysed again video replace its previous ones
+        with self.connection:
+            self.connection.execute("DELETE FROM events WHERE video = ?", (summary.video_name,))
+            self.connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", get_event_rows(summary))
+
+    def find_connection_interruptions(self, min_duration_ms=0):
+        # an interruption lasts until the next resume of the same video, interruptions never resumed are left out
+        return self.connection.execute(
+            "SELECT video, event_id, time_ms, duration_ms, clip_path FROM ("
+            "    SELECT video, event_id, time_ms, clip_path, ("
+            "        SELECT MIN(resumed.time_ms) FROM events resumed WHERE resumed.video = interruption.video"
+            "        AND resumed.type = ? AND resumed.event_id > interruption.event_id) - time_ms AS duration_ms"
+            "    FROM events interruption WHERE type = ?) "
+            "WHERE duration_ms >= ? ORDER BY duration_ms DESC",
+            (EventType.VIDEO_RESUMED.value, EventType.VIDEO_CONNECTION_INTERRUPTION.value, min_duration_ms)).fetchall()
+
+    def count_events_by_type(self):
+        return self.connection.execute("SELECT type, COUNT(*) FROM events GROUP BY type ORDER BY type").fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+def index_summaries(summaries, jsonl_path=None, sqlite_path=None):
+    corpora = []
+
+    if jsonl_path:
+        corpora.append(JsonlEventCorpus(jsonl_path))
+
+    if sqlite_path:
+        corpora.append(SqliteEventIndex(sqlite_path))
+
+    for corpus in corpora:
+        for summary in summaries:
+            corpus.add_video_events(summary)
+
+        corpus.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the event index of analysed videos.")
+    parser.add_argument("index_path", help="SQLite index written with --event-index")
+    parser.add_argument("--interruptions-longer-than", type=float, metavar="SECONDS",
+                        help="list connection interruptions lasting at least this long")
+    args = parser.parse_args()
+
+    event_index = SqliteEventIndex(args.index_path)
+
+    if args.interruptions_longer_than is not None:
+        for video, event_id, time_ms, duration_ms, clip_path in \
+                event_index.find_connection_interruptions(args.interruptions_longer_than * 1000):
+            print(video + ";" + str(event_id) + ";" + str(time_ms) + ";" + str(round(duration_ms / 1000, 2)) + "s;"
+                  + str(clip_path or ""))
+    else:
+        for event_type, events_count in event_index.count_events_by_type():
+            print(event_type + ": " + str(events_count))
+
+    event_index.close()
@@ -1,5 +1,38 @@
+import dataclasses
+from dataclasses import dataclass
+from enum import Enum
 
-def print_time_title_event(title, time, file, event_id):
+
+class EventType(Enum):
+    VIDEO_START_INITIALIZING = "video_start_initializing"
+    VIDEO_END_INITIALIZING = "video_end_initializing"
+    VIDEO_START_PLAYING = "video_start_playing"
+    VIDEO_CONNECTION_INTERRUPTION = "video_connection_interruption"
+    VIDEO_RESUMED = "video_resumed"
+    FULL_SCREEN_TOGGLE = "full_screen_toggle"
+    URL_CHANGED = "url_changed"
+    VIDEO_LOST = "video_lost"
+    VIDEO_COME_BACK = "video_come_back"
+
+
+@dataclass
+class EventRecord:
+    event_id: int
+    event_type: EventType
+    title: str
+    time: float
+
+
+def get_event_data(event):
+    # plain values of a record, so it can be saved as JSON
+    return {**dataclasses.asdict(event), "event_type": event.event_type.value}
+
+
+def get_event_record(event_data):
+    return EventRecord(**{**event_data, "event_type": EventType(event_data["event_type"])})
+
+
+def get_time_message(time):
     hours = int(time / 3600000)
     minutes = int((time % 3600000) / 60000)
     seconds = round((time % 60000) / 1000, 2)
@@ -7,53 +40,59 @@ def print_time_title_event(title, time, file, event_id):
     time_message = str(hours) + "h " if hours > 0 else ""
     time_message += str(minutes) + "min " if hours > 0 or minutes > 0 else ""
     time_message += str(seconds) + "s"
+    return time_message
+
+
+def get_event_line(event):
+    return ";".join([str(event.event_id), event.title, str(event.time), get_time_message(event.time)]) + "\n"
+
 
-    full_event = str(event_id) + ";" + title + ";" + str(time) + ";" + time_message + "\n"
-    file.write(full_event)
+def print_time_title_event(title, time, event_sink, event_id, event_type):
+    event_sink.write_event(EventRecord(int(event_id), event_type, title, time))
 
 
-def print_video_start_initializing(file, time, event_id):
+def print_video_start_initializing(event_sink, time, event_id):
     title = "Video started to initialize: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_START_INITIALIZING)
 
 
-def print_video_end_initializing(file, time, event_id):
+def print_video_end_initializing(event_sink, time, event_id):
     title = "Video ended initializing: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_END_INITIALIZING)
 
 
-def print_video_start_playing(file, time, event_id):
+def print_video_start_playing(event_sink, time, event_id):
     title = "Video started playing: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_START_PLAYING)
 
 
-def print_video_connection_interruption(file, time, event_id):
+def print_video_connection_interruption(event_sink, time, event_id):
     title = "Video connection interruption: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_CONNECTION_INTERRUPTION)
 
 
-def print_video_resumed(file, time, event_id):
+def print_video_resumed(event_sink, time, event_id):
     title = "Video resumed: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_RESUMED)
 
 
-def print_full_screen_toggle(file, time, value, event_id):
+def print_full_screen_toggle(event_sink, time, value, event_id):
     title = "Full screen toggled to " + str(value) + ":"
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.FULL_SCREEN_TOGGLE)
 
 
-def print_url_changed(file, time, event_id):
+def print_url_changed(event_sink, time, event_id):
     title = "URL changed: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.URL_CHANGED)
 
 
 # Not Implemented!
-def print_video_lost(file, time, event_id):
+def print_video_lost(event_sink, time, event_id):
     title = "Scroll bar changed: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_LOST)
 
 
 # Not Implemented!
-def print_video_come_back(file, time, event_id):
+def print_video_come_back(event_sink, time, event_id):
     title = "Video came back to place: "
-    print_time_title_event(title, time, file, event_id)
+    print_time_title_event(title, time, event_sink, event_id, EventType.VIDEO_COME_BACK)
@@ -0,0 +1,38 @@
+from eventPrinter import get_event_line
+
+
+class TextEventSink:
+    # events.txt lines, the same as before sinks were introduced
+    def __init__(self, file):
+        self.file = file
+
+    def write_event(self, event):
+        self.file.write(get_event_line(event))
+
+    def close(self):
+        self.file.close()
+
+
+class MemoryEventSink:
+    # events are kept as records, so they can be renumbered or indexed after analysis
+    def __init__(self):
+        self.events = []
+
+    def write_event(self, event):
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+
+class MultiEventSink:
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def write_event(self, event):
+        for sink in self.sinks:
+            sink.write_event(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
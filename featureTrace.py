@@ -0,0 +1,220 @@
+import argparse
+import io
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import videoExtensions
+from eventSinks import MemoryEventSink
+from videoStateMachine import VideoStateMachine
+
+# player features are recorded for the found player and for the full screen, the state machine looks at one of them
+CONTOUR_FEATURES = ["playing_contours", "no_popup_contours", "popup_contours"]
+TRACE_COLUMNS = ["time", "is_player_black", "is_player_black_coarse", "url_bar_contours", "full_screen_contours"] \
+    + ["player_" + feature for feature in CONTOUR_FEATURES] + ["screen_" + feature for feature in CONTOUR_FEATURES]
+TRACE_FLAG_COLUMNS = ["is_player_black", "is_player_black_coarse"]
+
+# grid sizes of black player checks of the state machine, the coarse one looks for black background of a popup
+BLACK_PLAYER_GRID_SIZE = 10
+COARSE_BLACK_PLAYER_GRID_SIZE = 4
+
+# detector thresholds of videoExtensions, which can be changed in replay next to parameters of the state machine
+DETECTOR_THRESHOLDS = ["URL_BAR_MIN_CONTOURS", "FULL_SCREEN_MIN_CONTOURS", "PLAYING_MIN_CONTOURS", "NO_POPUP_MIN_CONTOURS",
+                       "POPUP_MAX_CONTOURS", "MAX_NO_POPUP_DIFF_COUNT"]
+
+
+@dataclass
+class FeatureTrace:
+    video_name: str
+    resolution: tuple
+    analysis_scale: float
+    player_contour: np.ndarray
+    columns: dict = field(default_factory=dict)
+
+
+def get_trace_path(video_name):
+    return "out\\" + video_name + "\\features.npz"
+
+
+class FeatureTraceRecorder:
+    # counts of all detectors for every pair of frames, also for frames the state machine skipped or did not check
+    def __init__(self, path):
+        self.path = path
+        self.columns = {column_name: [] for column_name in TRACE_COLUMNS}
+
+    def add_frame(self, stateMachine):
+        frame_context = stateMachine.frame_context
+        video_contour = stateMachine.video_contour
+        features = dict.fromkeys(TRACE_COLUMNS, 0)
+        features["time"] = stateMachine.current_time
+
+        # until the player is found it is searched on every frame, nothing but its black check is needed then
+        if video_contour is not None:
+            features["is_player_black"] = frame_context.is_video_initializing(video_contour, BLACK_PLAYER_GRID_SIZE)
+
+        if stateMachine.had_video_once:
+            features["is_player_black_coarse"] = frame_context.is_video_initializing(video_contour,
+                                                                                     COARSE_BLACK_PLAYER_GRID_SIZE)
+            features["url_bar_contours"] = frame_context.count_url_bar_contours()
+            features["full_screen_contours"] = frame_context.count_full_screen_contours()
+
+            for prefix, contour in [("player_", video_contour), ("screen_", stateMachine.SCREEN_CONTOUR)]:
+                features[prefix + "playing_contours"] = frame_context.count_playing_contours(contour)
+                features[prefix + "no_popup_contours"], features[prefix + "popup_contours"] = \
+                    frame_context.count_popup_contours(contour)
+
+        for column_name, value in features.items():
+            self.columns[column_name].append(value)
+
+    def save(self, stateMachine):
+        arrays = {column_name: np.array(values, np.float64 if column_name == "time" else
+                                        bool if column_name in TRACE_FLAG_COLUMNS else np.int32)
+                  for column_name, values in self.columns.items()}
+        player_contour = stateMachine.video_contour if stateMachine.video_contour is not None else np.zeros((0, 2), np.int32)
+
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as trace_file:
+            np.savez_compressed(trace_file, video_name=stateMachine.event_writer.video_name,
+                                resolution=np.array(stateMachine.layout.resolution),
+                                analysis_scale=stateMachine.layout.analysis_scale, player_contour=player_contour, **arrays)
+
+        os.replace(temporary_path, self.path)
+
+
+def load_trace(path):
+    with np.load(path) as trace_data:
+        return FeatureTrace(str(trace_data["video_name"]), tuple(int(size) for size in trace_data["resolution"]),
+                            float(trace_data["analysis_scale"]), trace_data["player_contour"],
+                            {column_name: trace_data[column_name] for column_name in TRACE_COLUMNS})
+
+
+class TraceFrameContext:
+    # answers detectors of the state machine from recorded counts instead of frames
+    def __init__(self, trace, index, layout, thresholds):
+        self.trace = trace
+        self.index = index
+        self.layout = layout
+        self.thresholds = thresholds
+
+    def get_feature(self, column_name):
+        return self.trace.columns[column_name][self.index]
+
+    def get_contour_feature(self, contour, feature):
+        prefix = "screen_" if contour is self.layout.screen_contour else "player_"
+        return self.get_feature(prefix + feature)
+
+    def has_url_bar_changed(self):
+        return self.get_feature("url_bar_contours") >= self.thresholds["URL_BAR_MIN_CONTOURS"]
+
+    def is_full_screen_toggled(self):
+        return self.get_feature("full_screen_contours") >= self.thresholds["FULL_SCREEN_MIN_CONTOURS"]
+
+    def is_video_playing(self, contour):
+        return self.get_contour_feature(contour, "playing_contours") \
+            >= self.layout.scale_count(self.thresholds["PLAYING_MIN_CONTOURS"]) + 1
+
+    def is_loading_popup_visible(self, contour, img_diff_count):
+        has_no_popup_diff = self.get_contour_feature(contour, "no_popup_contours") \
+            >= self.layout.scale_count(self.thresholds["NO_POPUP_MIN_CONTOURS"])
+        is_visible = 0 < self.get_contour_feature(contour, "popup_contours") <= self.thresholds["POPUP_MAX_CONTOURS"]
+
+        return videoExtensions.get_loading_popup_result(is_visible, has_no_popup_diff, img_diff_count,
+                                                        self.thresholds["MAX_NO_POPUP_DIFF_COUNT"])
+
+    def find_biggest_contour(self, search_scale=1.0):
+        # the player is searched before any threshold matters, so the one found while recording is used
+        return self.trace.player_contour
+
+    def is_video_initializing(self, contour, grid_check_size=BLACK_PLAYER_GRID_SIZE):
+        if grid_check_size == COARSE_BLACK_PLAYER_GRID_SIZE:
+            return self.get_feature("is_player_black_coarse")
+
+        return self.get_feature("is_player_black")
+
+
+class TraceEventWriter:
+    # replay writes no clips, so requested ones are dropped
+    def __init__(self):
+        self.requested_events = []
+
+    def receive_frame(self, frame):
+        pass
+
+    def request_event_write(self, event_id, delay=-1, event_type=None):
+        pass
+
+    def request_instant_event_write(self, event_id, offset=0, event_type=None):
+        pass
+
+    def flush(self):
+        pass
+
+
+def replay_trace(trace, parameters=None):
+    parameters = parameters or {}
+    event_records = MemoryEventSink()
+    stateMachine = VideoStateMachine()
+    stateMachine.initialize(trace.resolution[0], trace.resolution[1], trace.video_name, io.StringIO(),
+                            event_sinks=[event_records], analysis_scale=trace.analysis_scale,
+                            event_writer=TraceEventWriter())
+
+    thresholds = {threshold_name: getattr(videoExtensions, threshold_name) for threshold_name in DETECTOR_THRESHOLDS}
+    for parameter_name, value in parameters.items():
+        if parameter_name in thresholds:
+            thresholds[parameter_name] = value
+        elif hasattr(VideoStateMachine, parameter_name):
+            setattr(stateMachine, parameter_name, value)
+        else:
+            raise ValueError("unknown parameter " + parameter_name)
+
+    for index, frame_time in enumerate(trace.columns["time"]):
+        stateMachine.run_current_state(None, None, float(frame_time),
+                                       TraceFrameContext(trace, index, stateMachine.layout, thresholds))
+
+    stateMachine.save_text_file()
+    return event_records.events
+
+
+def parse_parameter(text):
+    name, value = text.split("=")
+    return name, [float(number) if "." in number else int(number) for number in value.split(",")]
+
+
+def get_events_description(events):
+    events_count_by_type = {}
+    for event in events:
+        events_count_by_type[event.event_type.value] = events_count_by_type.get(event.event_type.value, 0) + 1
+
+    return str(len(events)) + " events" + "".join(", " + event_type + " " + str(events_count)
+                                                  for event_type, events_count in sorted(events_count_by_type.items()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay feature traces recorded with --record-features with other "
+                                                 "thresholds, without decoding videos.")
+    parser.add_argument("trace_paths", nargs="+", help="features.npz files of analysed videos")
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE",
+                        help="parameters of VideoStateMachine or detector thresholds of videoExtensions, "
+                             "e.g. MAX_TIMES_LOADING_POPUP_VISIBLE=10")
+    parser.add_argument("--sweep", nargs="*", default=[], metavar="NAME=VALUE,VALUE",
+                        help="replay every combination of these values")
+    args = parser.parse_args()
+
+    traces = [load_trace(trace_path) for trace_path in args.trace_paths]
+    fixed_parameters = {name: values[0] for name, values in map(parse_parameter, args.set)}
+    swept_parameters = dict(map(parse_parameter, args.sweep))
+
+    for swept_values in itertools.product(*swept_parameters.values()):
+        parameters = {**fixed_parameters, **dict(zip(swept_parameters, swept_values))}
+        start_time = time.perf_counter()
+        events_of_traces = [replay_trace(trace, parameters) for trace in traces]
+
+        print(", ".join(name + "=" + str(value) for name, value in parameters.items()) or "recorded parameters")
+        for trace, events in zip(traces, events_of_traces):
+            print("  " + trace.video_name + ": " + get_events_description(events))
+
+        print("  total: " + get_events_description([event for events in events_of_traces for event in events])
+              + " in " + str(round(time.perf_counter() - start_time, 2)) + "s")
@@ -0,0 +1,214 @@
+import collections
+
+import cv2
+import numpy as np
+
+
+def get_free_scratch_frame(history, frames_in_use):
+    used_addresses = [frame.ctypes.data for frame in frames_in_use if frame is not None]
+
+    for i in range(len(history.scratch_frames)):
+        scratch_index = (history.next_scratch_index + i) % len(history.scratch_frames)
+        scratch_frame = history.scratch_frames[scratch_index]
+
+        if scratch_frame.ctypes.data not in used_addresses:
+            history.next_scratch_index = (scratch_index + 1) % len(history.scratch_frames)
+            return scratch_frame
+
+    raise RuntimeError("Frame history has no free scratch slot left")
+
+
+class FrameRingBuffer:
+    # two more slots than history, one for the previous frame not received yet and one for the frame being read
+    EXTRA_SLOTS_COUNT = 2
+
+    def __init__(self, size, resolution):
+        width, height = resolution
+        self.size = size
+        self.frames = np.empty((size + self.EXTRA_SLOTS_COUNT, height, width, 3), np.uint8)
+        self.frame_bytes = self.frames[0].nbytes
+
+        # chronological ring of slot indexes, the same slot can be repeated for frames which were not decoded
+        self.history = np.zeros(size, np.int32)
+        self.history_start = 0
+        self.history_length = 0
+        self.slot_usages = np.zeros(len(self.frames), np.int32)
+        self.next_free_slot_index = 0
+
+    def __len__(self):
+        return self.history_length
+
+    def get_kept_frames_count(self):
+        return self.history_length
+
+    def get_slot_index(self, frame):
+        if frame is None or frame.base is not self.frames:
+            return None
+
+        return (frame.ctypes.data - self.frames.ctypes.data) // self.frame_bytes
+
+    def get_free_frame_slot(self, *frames_in_use):
+        used_slot_indexes = [self.get_slot_index(frame) for frame in frames_in_use]
+
+        for i in range(len(self.frames)):
+            slot_index = (self.next_free_slot_index + i) % len(self.frames)
+
+            if self.slot_usages[slot_index] == 0 and slot_index not in used_slot_indexes:
+                self.next_free_slot_index = (slot_index + 1) % len(self.frames)
+                return self.frames[slot_index]
+
+        raise RuntimeError("Frame ring buffer has no free slot left")
+
+    def receive_frame(self, frame):
+        slot_index = self.get_slot_index(frame)
+
+        if slot_index is None:
+            # frames decoded outside of the buffer are copied in once
+            slot = self.get_free_frame_slot()
+            np.copyto(slot, frame)
+            slot_index = self.get_slot_index(slot)
+
+        if self.history_length == self.size:
+            self.slot_usages[self.history[self.history_start]] -= 1
+            self.history_start = (self.history_start + 1) % self.size
+            self.history_length -= 1
+
+        self.history[(self.history_start + self.history_length) % self.size] = slot_index
+        self.history_length += 1
+        self.slot_usages[slot_index] += 1
+
+    def get_frames(self, start, stop):
+        # indexes work the same way as slicing a chronological list of received frames
+        frames = []
+
+        for i in range(*slice(start, stop).indices(self.history_length)):
+            frames.append(self.frames[self.history[(self.history_start + i) % self.size]])
+
+        return frames
+
+    def get_frames_copy(self, start, stop):
+        # slots are reused later, so frames leaving the analysis thread need their own copy
+        return [frame.copy() for frame in self.get_frames(start, stop)]
+
+    def get_memory_used(self):
+        return self.frames.nbytes
+
+
+class CompressedFrameHistory:
+    # frames are read into a few scratch slots and only their encoded form is kept in history
+    SCRATCH_SLOTS_COUNT = 3
+
+    def __init__(self, size, resolution, image_format=".jpg", quality=90, scale=1.0, memory_budget=0):
+        width, height = resolution
+        self.size = size
+        self.resolution = resolution
+        self.image_format = image_format
+        self.scale = scale
+        self.memory_budget = memory_budget
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, quality] if image_format == ".jpg" else []
+
+        self.scratch_frames = np.empty((self.SCRATCH_SLOTS_COUNT, height, width, 3), np.uint8)
+        self.next_scratch_index = 0
+
+        self.encoded_frames = collections.deque()
+        self.received_count = 0
+        self.memory_used = 0
+        self.peak_memory_used = 0
+
+        self.last_frame = None
+        self.last_encoded_frame = None
+
+    def __len__(self):
+        return min(self.received_count, self.size)
+
+    def get_kept_frames_count(self):
+        # the memory budget may drop the oldest frames before the history is full
+        return len(self.encoded_frames)
+
+    def get_free_frame_slot(self, *frames_in_use):
+        return get_free_scratch_frame(self, frames_in_use)
+
+    def encode_frame(self, frame):
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        return cv2.imencode(self.image_format, frame, self.encode_params)[1]
+
+    def decode_frame(self, encoded_frame):
+        frame = cv2.imdecode(encoded_frame, cv2.IMREAD_COLOR)
+
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, self.resolution, interpolation=cv2.INTER_LINEAR)
+
+        return frame
+
+    def receive_frame(self, frame):
+        # frames which were not decoded are represented by the same previous frame, so it is encoded only once
+        if frame is not self.last_frame:
+            self.last_frame = frame
+            self.last_encoded_frame = self.encode_frame(frame)
+
+        self.encoded_frames.append((self.received_count, self.last_encoded_frame))
+        self.received_count += 1
+        self.memory_used += self.last_encoded_frame.nbytes
+
+        while len(self.encoded_frames) > self.size or \
+                (self.memory_budget > 0 and self.memory_used > self.memory_budget and len(self.encoded_frames) > 1):
+            self.memory_used -= self.encoded_frames.popleft()[1].nbytes
+
+        self.peak_memory_used = max(self.peak_memory_used, self.memory_used)
+
+    def get_frames(self, start, stop):
+        # indexes work as for a full history, frames dropped because of the memory budget are left out
+        first_index = self.received_count - len(self)
+        oldest_index = self.encoded_frames[0][0] if self.encoded_frames else self.received_count
+        frames = []
+
+        for i in range(*slice(start, stop).indices(len(self))):
+            frame_index = first_index + i
+            if frame_index >= oldest_index:
+                frames.append(self.decode_frame(self.encoded_frames[frame_index - oldest_index][1]))
+
+        return frames
+
+    def get_frames_copy(self, start, stop):
+        return self.get_frames(start, stop)
+
+    def get_memory_used(self):
+        return self.peak_memory_used + self.scratch_frames.nbytes
+
+
+class FrameIndexHistory:
+    # keeps only numbers of received frames, clips are cut from the source video after analysis
+    SCRATCH_SLOTS_COUNT = 3
+
+    def __init__(self, size, resolution, first_frame_index=0):
+        width, height = resolution
+        self.size = size
+        self.first_frame_index = first_frame_index
+        self.received_count = 0
+        self.scratch_frames = np.empty((self.SCRATCH_SLOTS_COUNT, height, width, 3), np.uint8)
+        self.next_scratch_index = 0
+
+    def __len__(self):
+        return min(self.received_count, self.size)
+
+    def get_kept_frames_count(self):
+        return len(self)
+
+    def get_free_frame_slot(self, *frames_in_use):
+        return get_free_scratch_frame(self, frames_in_use)
+
+    def receive_frame(self, frame):
+        # every received frame stands for the next frame of the video, even if it was not decoded
+        self.received_count += 1
+
+    def get_frames(self, start, stop):
+        first_index = self.first_frame_index + self.received_count - len(self)
+        return [first_index + i for i in range(*slice(start, stop).indices(len(self)))]
+
+    def get_frames_copy(self, start, stop):
+        return self.get_frames(start, stop)
+
+    def get_memory_used(self):
+        return self.scratch_frames.nbytes
@@ -0,0 +1,51 @@
+import cv2
+
+# places of the browser and the camera overlay were measured on 1920x1080 recordings
+REFERENCE_RESOLUTION = (1920, 1080)
+URL_BAR_PLACE = ((120, 45), (1300, 60))
+FULL_SCREEN_BUTTON_PLACE = ((1260, 5), (1315, 20))
+CAMERA_PLACE = ((1332, 0), (REFERENCE_RESOLUTION[0], 327))
+
+
+def scale_place(place, x_scale, y_scale):
+    return [(int(round(x * x_scale)), int(round(y * y_scale))) for x, y in place]
+
+
+class FrameLayout:
+    # computed once per video, places and sizes are in pixels of frames given to detectors
+    def __init__(self, resolution, analysis_scale=1.0):
+        width, height = resolution
+        self.resolution = resolution
+        self.analysis_scale = analysis_scale
+        self.analysis_resolution = (int(round(width * analysis_scale)), int(round(height * analysis_scale)))
+
+        analysis_width, analysis_height = self.analysis_resolution
+        x_scale = analysis_width / REFERENCE_RESOLUTION[0]
+        y_scale = analysis_height / REFERENCE_RESOLUTION[1]
+
+        # sizes of kernels and distances follow the height, so wider captures keep the same detail
+        self.pixel_scale = y_scale
+
+        # browser text is unreadable on downscaled frames, its small places are compared on full frames instead
+        self.url_bar_place = scale_place(URL_BAR_PLACE, width / REFERENCE_RESOLUTION[0], height / REFERENCE_RESOLUTION[1])
+        self.full_screen_button_place = scale_place(FULL_SCREEN_BUTTON_PLACE, width / REFERENCE_RESOLUTION[0],
+                                                    height / REFERENCE_RESOLUTION[1])
+
+        self.camera_place = scale_place(CAMERA_PLACE, x_scale, y_scale)
+        self.screen_contour = [(0, 0), (0, analysis_height), (analysis_width, 0), (analysis_width, analysis_height)]
+
+    def scale_length(self, length):
+        return length * self.pixel_scale
+
+    def scale_count(self, count):
+        # contours of moving picture are spread over the area, text of the browser keeps its count of letters
+        return max(1, int(round(count * self.pixel_scale ** 2)))
+
+    def is_scaled(self):
+        return self.analysis_resolution != self.resolution
+
+    def get_analysis_frame(self, frame):
+        if frame is None or not self.is_scaled():
+            return frame
+
+        return cv2.resize(frame, self.analysis_resolution, interpolation=cv2.INTER_NEAREST)
@@ -1,50 +1,170 @@
+import argparse
 import cv2
-import os
-from videoStateMachine import VideoStateMachine
+from batchRunner import find_video_paths, run_batch, print_batch_summary
+from eventIndex import index_summaries
+from eventPrinter import EventType
+from resultCache import ResultCache
+from streamProcessor import process_stream
+from streamSources import GrowingVideoStream, RawFrameStream
+from videoProcessor import ProcessingOptions
 
 if __name__ == '__main__':
 
-    # global parameters
-    frame_reading_speed = 10
+    parser = argparse.ArgumentParser(description="Collect occurred events from recorded YouTube sessions.")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of videos processed in parallel, 0 uses all CPU cores")
+    parser.add_argument("-s", "--segments", type=int, default=1,
+                        help="split every video into this many segments analysed in parallel, "
+                             "not with --adaptive-stride, --decode-queue, --record-features, --checkpoint-every, "
+                             "--resume or --stream")
+    parser.add_argument("--multi-stream", action="store_true",
+                        help="analyse all videos together in one process, one frame of every video per step, "
+                             "not with --workers, --segments, --adaptive-stride, --decode-queue, --record-features, "
+                             "--profile, --checkpoint-every, --resume or --stream")
+    parser.add_argument("--detector-processes", type=int, default=0, metavar="N",
+                        help="decode into shared memory and evaluate detectors of every frame in N worker processes, "
+                             "not with --segments, --multi-stream, --adaptive-stride, --change-gating, "
+                             "--record-features, --profile, --checkpoint-every, --resume or --stream")
+    parser.add_argument("--adaptive-stride", action="store_true",
+                        help="sample stable parts of videos sparsely and skip decoding of discarded frames")
+    parser.add_argument("--clip-encoders", type=int, default=0,
+                        help="number of background threads encoding event clips, 0 encodes them during analysis")
+    parser.add_argument("--clip-queue-size", type=int, default=4,
+                        help="number of clips waiting for encoding before analysis is blocked")
+    parser.add_argument("--decode-queue", type=int, default=0, metavar="FRAMES",
+                        help="decode on a separate thread up to this many frames ahead of analysis, not used with --adaptive-stride; "
+                             "with the raw clip history every frame is copied once more into the history")
+    parser.add_argument("--history-format", choices=["raw", "jpg", "png"], default="raw",
+                        help="how frames of the clip history are kept in memory")
+    parser.add_argument("--history-quality", type=int, default=90,
+                        help="JPEG quality of compressed clip history")
+    parser.add_argument("--history-scale", type=float, default=1.0,
+                        help="scale of frames kept in compressed clip history")
+    parser.add_argument("--history-budget", type=float, default=0,
+                        help="memory budget of compressed clip history in MB, 0 means no limit")
+    parser.add_argument("--lazy-clips", action="store_true",
+                        help="keep no frame history and cut event clips from the video after analysis")
+    parser.add_argument("--merge-clips", action="store_true",
+                        help="encode overlapping event clips once into segments indexed in out\\<video>\\clips.json")
+    parser.add_argument("--skip-clips", nargs="*", default=[], choices=[event_type.value for event_type in EventType],
+                        help="event types for which no clip is written")
+    parser.add_argument("--analysis-scale", type=float, default=1.0,
+                        help="scale of frames given to detectors, e.g. 0.5 or 0.25, clips keep the full resolution; "
+                             "thresholds are validated only for downscaled 1080p recordings")
+    parser.add_argument("--player-search-scale", type=float, default=1.0,
+                        help="scale of frames searched for the video player, e.g. 0.25, the player is a few pixels off")
+    parser.add_argument("--player-calibration", metavar="PATH",
+                        help="JSON file of player places found before, reused for videos of the same resolution")
+    parser.add_argument("--change-gating", action="store_true",
+                        help="skip detectors whose region is the same on both frames, with counts of skipped checks")
+    parser.add_argument("--record-features", action="store_true",
+                        help="save detector counts of every frame to out\\<video>\\features.npz for replay with featureTrace.py")
+    parser.add_argument("--checkpoint-every", type=int, default=0, metavar="FRAMES",
+                        help="save analysis state to out\\<video>\\checkpoint.json every this many frames, not used with --segments")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue every video from its checkpoint left by an interrupted run")
+    parser.add_argument("--result-cache", metavar="PATH",
+                        help="JSON file of results, videos unchanged since they were analysed with the same options are skipped")
+    parser.add_argument("--invalidate-cache", nargs="*", metavar="VIDEO",
+                        help="analyse these videos again even if their results are cached, no names invalidate all")
+    parser.add_argument("--profile", action="store_true",
+                        help="measure time of decoding, states, checks and clip writes, saved to out\\<video>\\profile.json")
+    parser.add_argument("--event-jsonl", metavar="PATH",
+                        help="write events of all videos to this JSON lines file, lines of analysed again videos are replaced")
+    parser.add_argument("--event-index", metavar="PATH",
+                        help="add events of all videos to this SQLite index, queried with eventIndex.py")
+    parser.add_argument("--stream", metavar="PATH",
+                        help="analyse a live source (a pipe, a FIFO, \"-\" for standard input or a growing file) instead of VideoSources")
+    parser.add_argument("--stream-format", choices=["raw", "video"], default="video",
+                        help="raw BGR frames or a video file readable by OpenCV")
+    parser.add_argument("--stream-name", default="stream",
+                        help="name of the output catalogue of the stream")
+    parser.add_argument("--stream-resolution", default="1920x1080",
+                        help="resolution of raw frames, WIDTHxHEIGHT")
+    parser.add_argument("--stream-fps", type=float, default=60,
+                        help="frame rate of raw frames")
+    parser.add_argument("--stream-timeout", type=float, default=10.0,
+                        help="seconds to wait for the first and for new frames of a growing video file before the stream is finished")
+    args = parser.parse_args()
 
-    # reading each video file in catalogue
-    video_catalogue_path = "VideoSources"
+    # the decoder and detector processes analyse whole videos, none of these options is passed to them
+    if args.detector_processes > 0:
+        conflicting_options = {"--segments": args.segments > 1, "--multi-stream": args.multi_stream,
+                               "--adaptive-stride": args.adaptive_stride, "--change-gating": args.change_gating,
+                               "--record-features": args.record_features, "--profile": args.profile,
+                               "--checkpoint-every": args.checkpoint_every > 0, "--resume": args.resume,
+                               "--stream": args.stream is not None}
+        used_options = [name for name, is_used in conflicting_options.items() if is_used]
+        if used_options:
+            parser.error("--detector-processes can not be used with " + ", ".join(used_options))
 
-    for file in os.listdir(video_catalogue_path):
-        if file.endswith(".mp4"):
-            video_path = video_catalogue_path + "/" + file
-            print("Work on " + file + " has started... Please don't close the application.")
+    # the engine steps all videos in one process with its own decoding loop, none of these options is passed to it
+    if args.multi_stream:
+        conflicting_options = {"--workers": args.workers != 1, "--segments": args.segments > 1,
+                               "--adaptive-stride": args.adaptive_stride, "--decode-queue": args.decode_queue > 0,
+                               "--record-features": args.record_features, "--profile": args.profile,
+                               "--checkpoint-every": args.checkpoint_every > 0, "--resume": args.resume,
+                               "--stream": args.stream is not None}
+        used_options = [name for name, is_used in conflicting_options.items() if is_used]
+        if used_options:
+            parser.error("--multi-stream can not be used with " + ", ".join(used_options))
 
-            # video reading
-            video = cv2.VideoCapture(video_path)
-            ret, previous_frame = video.read()
+    # segments are analysed by their own loop from a sought position, none of these options is passed to it
+    if args.segments > 1:
+        conflicting_options = {"--adaptive-stride": args.adaptive_stride, "--decode-queue": args.decode_queue > 0,
+                               "--record-features": args.record_features,
+                               "--checkpoint-every": args.checkpoint_every > 0, "--resume": args.resume,
+                               "--stream": args.stream is not None}
+        used_options = [name for name, is_used in conflicting_options.items() if is_used]
+        if used_options:
+            parser.error("--segments can not be used with " + ", ".join(used_options))
 
-            WIDTH = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
-            HEIGHT = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    options = ProcessingOptions(adaptive_stride=args.adaptive_stride,
+                                clip_encoder_workers=args.clip_encoders,
+                                clip_encoder_queue_size=args.clip_queue_size,
+                                history_format=args.history_format,
+                                history_quality=args.history_quality,
+                                history_scale=args.history_scale,
+                                history_memory_budget=int(args.history_budget * 2 ** 20),
+                                lazy_clips=args.lazy_clips,
+                                merge_clips=args.merge_clips,
+                                skipped_clip_event_types=tuple(args.skip_clips),
+                                profile=args.profile,
+                                analysis_scale=args.analysis_scale,
+                                player_search_scale=args.player_search_scale,
+                                player_calibration_path=args.player_calibration,
+                                checkpoint_interval=args.checkpoint_every,
+                                resume=args.resume,
+                                decode_queue_size=args.decode_queue,
+                                change_gating=args.change_gating,
+                                record_features=args.record_features,
+                                detector_processes=args.detector_processes)
 
-            # initializing state machine
-            stateMachine = VideoStateMachine()
-            stateMachine.initialize(WIDTH, HEIGHT, file[0:-4])
+    if args.invalidate_cache is not None and not args.result_cache:
+        print("Warning: --invalidate-cache does nothing without --result-cache.")
 
-            while video.isOpened():
-                is_read, current_frame = video.read()
+    if args.stream:
+        if args.stream_format == "raw":
+            width, height = args.stream_resolution.split("x")
+            source = RawFrameStream(args.stream, (int(width), int(height)), args.stream_fps)
+        else:
+            source = GrowingVideoStream(args.stream, idle_timeout=args.stream_timeout)
 
-                if is_read:
-                    copied_previous_frame = previous_frame.copy()
-                    current_time = video.get(cv2.CAP_PROP_POS_MSEC)
-                    stateMachine.run_current_state(copied_previous_frame, current_frame, current_time)
+        summary = process_stream(source, args.stream_name, options)
+        summaries, wall_time = [summary], summary.wall_time
+    else:
+        # reading each video file in catalogue
+        video_catalogue_path = "VideoSources"
+        video_paths = find_video_paths(video_catalogue_path)
 
-                    # enable both lines for activating frame debugging
-                    #if cv2.waitKey(frame_reading_speed) == ord('q'):
-                        #break
+        result_cache = ResultCache(args.result_cache, options, args.segments, args.multi_stream) if args.result_cache else None
+        if result_cache is not None and args.invalidate_cache is not None:
+            result_cache.invalidate(args.invalidate_cache)
 
-                    previous_frame = current_frame
-                else:
-                    break
+        summaries, wall_time = run_batch(video_paths, args.workers, args.segments, options, result_cache, args.multi_stream)
 
-            stateMachine.save_text_file()
-            video.release()
-            cv2.destroyAllWindows()
-            print("Work on " + file + "has ended.")
+    cv2.destroyAllWindows()
+    index_summaries(summaries, args.event_jsonl, args.event_index)
 
+    print_batch_summary(summaries, wall_time)
     print("Application finished working.")
@@ -0,0 +1,154 @@
+import time
+
+import cv2
+import numpy as np
+
+import videoExtensions
+from eventSinks import MemoryEventSink
+from videoProcessor import ProcessingOptions, VideoSummary, configure_change_gating, \
+    configure_event_writer, configure_player_search, get_video_name, materialise_event_clips, \
+    print_change_gating_report, print_clip_encoding_report
+from videoStateMachine import State, VideoStateMachine
+
+# differences of bigger stacks fall out of the CPU cache and are slower than one call per stream
+BATCHED_DIFF_MAX_PIXELS = 320 * 240
+
+
+class EngineStream:
+    # one video of the engine, with its own state machine and event writer
+    def __init__(self, video_path, options):
+        self.video_path = video_path
+        self.video_name = get_video_name(video_path)
+        self.video = cv2.VideoCapture(video_path)
+        self.resolution = (int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        self.event_records = MemoryEventSink()
+        self.stateMachine = VideoStateMachine()
+        self.stateMachine.initialize(self.resolution[0], self.resolution[1], self.video_name,
+                                     event_sinks=[self.event_records], analysis_scale=options.analysis_scale)
+        configure_player_search(self.stateMachine, options)
+        configure_change_gating(self.stateMachine, options)
+        configure_event_writer(self.stateMachine.event_writer, options)
+
+        # views of this stream into both stacked frames of its group, set by the group
+        self.frame_views = None
+        self.previous_frame = None
+        self.frames_count = 0
+        self.summary = None
+
+    def is_active(self):
+        return self.summary is None
+
+    def is_gray_diff_needed(self):
+        # the player is searched on the previous frame only and skipped frames are not analysed
+        return self.stateMachine.current_state != State.LOOKING_FOR_VIDEO and not self.stateMachine.skip_frame
+
+    def read_frame(self, buffer_index):
+        frame_view = self.frame_views[buffer_index]
+        is_read, frame = self.video.read(frame_view)
+
+        if is_read and frame is not frame_view:
+            np.copyto(frame_view, frame)
+
+        if is_read:
+            self.frames_count += 1
+
+        return is_read, frame_view
+
+    def run_step(self, next_frame, gray_diff=None):
+        stateMachine = self.stateMachine
+        frame_context = videoExtensions.FrameContext(self.previous_frame, next_frame, stateMachine.layout,
+                                                     stateMachine.frame_context, gray_diff, stateMachine.change_gate)
+        stateMachine.run_current_state(self.previous_frame, next_frame, self.video.get(cv2.CAP_PROP_POS_MSEC), frame_context)
+        self.previous_frame = next_frame
+
+    def finish(self, start_time):
+        self.stateMachine.save_text_file()
+        self.video.release()
+        materialise_event_clips(self.stateMachine.event_writer, self.video_path)
+        print_clip_encoding_report(self.stateMachine.event_writer)
+        print_change_gating_report(self.stateMachine)
+
+        event_writer = self.stateMachine.event_writer
+        self.summary = VideoSummary(self.video_path, self.video_name, self.frames_count, time.perf_counter() - start_time,
+                                    self.stateMachine.new_event_id - 1, event_writer.get_history_memory_used(),
+                                    self.event_records.events)
+        print("Work on " + self.video_name + " has ended.")
+
+
+class StreamGroup:
+    # streams of one resolution are decoded into stacked frames, so their differences are computed with one call
+    def __init__(self, streams):
+        width, height = streams[0].resolution
+        self.streams = streams
+        self.height = height
+        self.stacked_frames = [np.empty((len(streams) * height, width, 3), np.uint8) for i in range(2)]
+        self.next_buffer_index = 0
+
+        # detectors of downscaled analysis work on scaled frames, which are not stacked
+        self.is_batched = not streams[0].stateMachine.layout.is_scaled() and width * height <= BATCHED_DIFF_MAX_PIXELS
+
+        for index, stream in enumerate(streams):
+            stream.frame_views = [stacked_frame[index * height:(index + 1) * height] for stacked_frame in self.stacked_frames]
+
+    def start(self, start_time):
+        for stream in self.streams:
+            is_read, stream.previous_frame = stream.read_frame(self.next_buffer_index)
+
+            if not is_read:
+                stream.finish(start_time)
+
+        self.next_buffer_index = 1
+
+    def run_step(self, start_time):
+        next_frames = {}
+
+        for index, stream in enumerate(self.streams):
+            if stream.is_active():
+                is_read, next_frame = stream.read_frame(self.next_buffer_index)
+
+                if is_read:
+                    next_frames[index] = next_frame
+                else:
+                    stream.finish(start_time)
+
+        # rows of finished streams are compared too, one call for the whole stack is still cheaper than a call per stream
+        gray_diffs = None
+        if self.is_batched and next_frames and all(self.streams[index].is_gray_diff_needed() for index in next_frames):
+            gray_diffs = videoExtensions.apply_grayscale(cv2.absdiff(self.stacked_frames[1 - self.next_buffer_index],
+                                                                     self.stacked_frames[self.next_buffer_index]))
+
+        for index, next_frame in next_frames.items():
+            gray_diff = gray_diffs[index * self.height:(index + 1) * self.height] if gray_diffs is not None else None
+            self.streams[index].run_step(next_frame, gray_diff)
+
+        self.next_buffer_index = 1 - self.next_buffer_index
+        return any(stream.is_active() for stream in self.streams)
+
+
+def get_stream_groups(streams):
+    streams_by_resolution = {}
+
+    for stream in streams:
+        streams_by_resolution.setdefault(stream.resolution, []).append(stream)
+
+    return [StreamGroup(group_streams) for group_streams in streams_by_resolution.values()]
+
+
+def run_multi_stream_engine(video_paths, options=None):
+    # every video advances by one frame per step, all in one process and one thread
+    options = options or ProcessingOptions()
+    start_time = time.perf_counter()
+    print("Work on " + str(len(video_paths)) + " videos has started in one process... Please don't close the application.")
+
+    streams = [EngineStream(video_path, options) for video_path in video_paths]
+    stream_groups = get_stream_groups(streams)
+
+    for stream_group in stream_groups:
+        stream_group.start(start_time)
+
+    active_groups = [stream_group for stream_group in stream_groups if any(stream.is_active() for stream in stream_group.streams)]
+    while active_groups:
+        active_groups = [stream_group for stream_group in active_groups if stream_group.run_step(start_time)]
+
+    return [stream.summary for stream in streams]
@@ -0,0 +1,117 @@
+import collections
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# frames held by the analysis loop at once, the previous and the current one
+FRAMES_IN_USE_COUNT = 2
+
+
+class PipelinedVideoCapture:
+    # decodes on its own thread ahead of analysis, cv2 releases the GIL while decoding so both stages overlap
+    def __init__(self, video, queue_size=8):
+        self.video = video
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.free_buffers = queue.Queue()
+        self.frames_in_use = collections.deque()
+        self.is_stopped = False
+        self.is_finished = False
+
+        self.current_time = video.get(cv2.CAP_PROP_POS_MSEC)
+        self.position = int(video.get(cv2.CAP_PROP_POS_FRAMES))
+
+        # a buffer is decoded into while the queue is full and the analysis loop holds its frames
+        width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        for i in range(queue_size + FRAMES_IN_USE_COUNT + 1):
+            self.free_buffers.put(np.empty((height, width, 3), np.uint8))
+
+        self.decode_time = 0.0
+        self.decoder_stall_time = 0.0
+        self.analysis_stall_time = 0.0
+        self.queue_depths = []
+
+        self.decoder = threading.Thread(target=self.decode_frames, daemon=True)
+        self.decoder.start()
+
+    def decode_frames(self):
+        is_read = True
+
+        try:
+            while is_read and not self.is_stopped:
+                stall_start_time = time.perf_counter()
+                buffer = self.free_buffers.get()
+                decode_start_time = time.perf_counter()
+                is_read, frame = self.video.read(buffer)
+                frame_time = self.video.get(cv2.CAP_PROP_POS_MSEC)
+                decode_end_time = time.perf_counter()
+
+                self.frames.put((is_read, frame, frame_time))
+                self.decode_time += decode_end_time - decode_start_time
+                self.decoder_stall_time += (decode_start_time - stall_start_time) + (time.perf_counter() - decode_end_time)
+        finally:
+            # analysis always gets the end of the video, even if decoding failed
+            if is_read:
+                self.frames.put((False, None, self.current_time))
+
+    def read(self, image=None):
+        # frames are decoded before the analysis hands out its slot, so the given image is not used and the raw clip
+        # history copies every frame once from the buffer of the pipeline
+        if self.is_finished:
+            return False, None
+
+        self.queue_depths.append(self.frames.qsize())
+        stall_start_time = time.perf_counter()
+        is_read, frame, frame_time = self.frames.get()
+        self.analysis_stall_time += time.perf_counter() - stall_start_time
+
+        if not is_read:
+            self.is_finished = True
+            return False, None
+
+        self.current_time = frame_time
+        self.position += 1
+
+        # frames older than the previous one are not used by the analysis loop anymore
+        self.frames_in_use.append(frame)
+        while len(self.frames_in_use) > FRAMES_IN_USE_COUNT:
+            self.free_buffers.put(self.frames_in_use.popleft())
+
+        return True, frame
+
+    def get(self, property_id):
+        if property_id == cv2.CAP_PROP_POS_MSEC:
+            return self.current_time
+
+        if property_id == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+
+        return self.video.get(property_id)
+
+    def isOpened(self):
+        return not self.is_finished and self.video.isOpened()
+
+    def release(self):
+        self.is_stopped = True
+
+        # the decoder may wait for a free buffer or for space in the queue
+        while self.decoder.is_alive():
+            self.free_buffers.put(np.empty(0, np.uint8))
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                pass
+
+            self.decoder.join(0.01)
+
+        self.video.release()
+
+    def print_report(self):
+        mean_queue_depth = sum(self.queue_depths) / len(self.queue_depths) if self.queue_depths else 0.0
+        print("  pipeline: decoding " + str(round(self.decode_time, 2)) + "s, decoder stalled "
+              + str(round(self.decoder_stall_time, 2)) + "s, analysis stalled " + str(round(self.analysis_stall_time, 2))
+              + "s, queue depth mean " + str(round(mean_queue_depth, 1)) + " of " + str(self.frames.maxsize)
+              + ", max " + str(max(self.queue_depths, default=0)))
@@ -0,0 +1,41 @@
+import json
+import os
+
+import numpy as np
+
+
+def get_layout_key(layout):
+    width, height = layout.resolution
+    return str(width) + "x" + str(height) + "@" + str(layout.analysis_scale)
+
+
+class PlayerCalibration:
+    # player rectangles of recordings with the same resolution and analysis scale, shared between runs in a JSON file
+    def __init__(self, path):
+        self.path = path
+        self.contours = self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return {}
+
+        with open(self.path) as calibration_file:
+            return json.load(calibration_file)
+
+    def get_contour(self, layout):
+        contour = self.contours.get(get_layout_key(layout))
+        return np.array(contour) if contour is not None else None
+
+    def set_contour(self, layout, contour):
+        key = get_layout_key(layout)
+        if self.contours.get(key) == contour.tolist():
+            return
+
+        # other videos may be analysed at the same time, so their rectangles are merged before the file is replaced
+        self.contours = {**self.load(), key: contour.tolist()}
+        temporary_path = self.path + "." + str(os.getpid()) + ".tmp"
+
+        with open(temporary_path, "w") as calibration_file:
+            json.dump(self.contours, calibration_file, indent=4)
+
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,60 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class Profiler:
+    # cumulative time and calls count of every measured part of the analysis
+    def __init__(self):
+        self.records = {}
+
+    def add(self, name, elapsed_time, calls_count=1):
+        record = self.records.setdefault(name, {"calls": 0, "time": 0.0})
+        record["calls"] += calls_count
+        record["time"] += elapsed_time
+
+    def merge(self, records):
+        for name, record in records.items():
+            self.add(name, record["time"], record["calls"])
+
+    @contextmanager
+    def measure(self, name):
+        start_time = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - start_time)
+
+    def wrap(self, name, function):
+        # name can be a function, so it is chosen when the call starts, e.g. by the current state
+        def profiled_function(*args, **kwargs):
+            record_name = name() if callable(name) else name
+            start_time = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.add(record_name, time.perf_counter() - start_time)
+            return result
+
+        return profiled_function
+
+    def save(self, path, wall_time):
+        with open(path, "w") as profile_file:
+            json.dump({"wall_time": wall_time, "records": self.records}, profile_file, indent=4)
+
+    def print_summary(self, title, wall_time):
+        # parts are nested, checks and clip writes are also counted in the state they run in
+        print("  profile of " + title + ", " + str(round(wall_time, 2)) + "s wall time:")
+
+        for name, record in sorted(self.records.items(), key=lambda item: item[1]["time"], reverse=True):
+            share = record["time"] / wall_time * 100 if wall_time > 0 else 0.0
+            print("    " + name + ": " + str(round(record["time"], 3)) + "s (" + str(round(share, 1)) + "%), "
+                  + str(record["calls"]) + " calls, "
+                  + str(round(record["time"] / record["calls"] * 1000, 3)) + " ms per call")
+
+
+class ProfiledVideoCapture:
+    # measures decoding of a cv2.VideoCapture, all other calls are passed through
+    def __init__(self, video, profiler):
+        self.video = video
+        self.read = profiler.wrap("decode.read", video.read)
+        self.grab = profiler.wrap("decode.grab", video.grab)
+
+    def __getattr__(self, name):
+        return getattr(self.video, name)
@@ -0,0 +1,117 @@
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+
+from clipSegments import get_clip_index_path, load_clip_index
+from eventIndex import get_clip_path
+from eventPrinter import get_event_data, get_event_record
+from videoProcessor import VideoSummary
+
+# a few samples spread over the file are hashed together with its size instead of the whole video
+FINGERPRINT_SAMPLE_SIZE = 2 ** 20
+FINGERPRINT_SAMPLES_COUNT = 4
+
+
+# options changing only the speed or the reporting of analysis
+RESULT_NEUTRAL_OPTIONS = ["clip_encoder_workers", "clip_encoder_queue_size", "profile", "checkpoint_interval", "resume",
+                          "change_gating", "detector_processes", "decode_queue_size"]
+
+
+def get_video_fingerprint(video_path):
+    video_size = os.path.getsize(video_path)
+    fingerprint = hashlib.blake2b(str(video_size).encode(), digest_size=16)
+
+    with open(video_path, "rb") as video_file:
+        for i in range(FINGERPRINT_SAMPLES_COUNT):
+            video_file.seek(int(max(0, video_size - FINGERPRINT_SAMPLE_SIZE) * i / (FINGERPRINT_SAMPLES_COUNT - 1)))
+            fingerprint.update(video_file.read(FINGERPRINT_SAMPLE_SIZE))
+
+    return fingerprint.hexdigest()
+
+
+def get_configuration_key(options, segments_count=1, multi_stream=False):
+    configuration = hashlib.blake2b(digest_size=16)
+
+    # results depend on the code of every module a run imports, so any change of the package invalidates the cache
+    for module_path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        configuration.update(os.path.basename(module_path).encode())
+        with open(module_path, "rb") as module_file:
+            configuration.update(module_file.read())
+
+    # players found in the calibration file are reused instead of searched, so its content is part of the key
+    if options.player_calibration_path and os.path.isfile(options.player_calibration_path):
+        with open(options.player_calibration_path, "rb") as calibration_file:
+            configuration.update(calibration_file.read())
+
+    result_options = {name: value for name, value in dataclasses.asdict(options).items() if name not in RESULT_NEUTRAL_OPTIONS}
+    result_options.update({"segments_count": segments_count, "multi_stream": multi_stream})
+    configuration.update(json.dumps(result_options, sort_keys=True, default=str).encode())
+    return configuration.hexdigest()
+
+
+class ResultCache:
+    # summaries of analysed videos, reused while the video, the code, the options and the run mode stay the same
+    def __init__(self, path, options, segments_count=1, multi_stream=False):
+        self.path = path
+        self.configuration_key = get_configuration_key(options, segments_count, multi_stream)
+        self.entries = {}
+        self.hits_count = 0
+        self.misses_count = 0
+
+        if os.path.isfile(path):
+            with open(path) as cache_file:
+                self.entries = json.load(cache_file)
+
+    def invalidate(self, video_names=()):
+        # no names invalidate every video
+        self.entries = {video_path: entry for video_path, entry in self.entries.items()
+                        if video_names and entry["summary"]["video_name"] not in video_names}
+
+    def get_summary(self, video_path):
+        entry = self.entries.get(video_path)
+        is_valid = entry is not None and entry["configuration"] == self.configuration_key \
+            and entry["fingerprint"] == get_video_fingerprint(video_path) \
+            and all(os.path.isfile(output_path) for output_path in entry["outputs"])
+
+        if not is_valid:
+            self.misses_count += 1
+            return None
+
+        self.hits_count += 1
+        summary_data = dict(entry["summary"])
+        summary_data["events"] = [get_event_record(event_data) for event_data in summary_data["events"]]
+        return VideoSummary(**summary_data, is_cached=True)
+
+    def add_summary(self, summary):
+        summary_data = dataclasses.asdict(summary)
+        summary_data["events"] = [get_event_data(event) for event in summary.events]
+        del summary_data["is_cached"]
+
+        # events and clips are reused from the output catalogue, so the cache is only valid while they are there
+        outputs = ["out\\" + summary.video_name + "\\events.txt"]
+        clip_index = load_clip_index(get_clip_index_path(summary.video_name))
+        if clip_index:
+            outputs.append(get_clip_index_path(summary.video_name))
+
+        # merged clips of several events share one segment
+        clip_paths = (get_clip_path(summary.video_name, event, clip_index) for event in summary.events)
+        outputs += list(dict.fromkeys(clip_path for clip_path in clip_paths if clip_path))
+
+        self.entries[summary.video_path] = {"fingerprint": get_video_fingerprint(summary.video_path),
+                                            "configuration": self.configuration_key, "summary": summary_data,
+                                            "outputs": outputs}
+
+    def save(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as cache_file:
+            json.dump(self.entries, cache_file, indent=4)
+
+        os.replace(temporary_path, self.path)
+
+    def print_report(self):
+        lookups_count = self.hits_count + self.misses_count
+        hit_rate = self.hits_count / lookups_count * 100 if lookups_count > 0 else 0.0
+        print("Result cache: " + str(self.hits_count) + " hits, " + str(self.misses_count) + " misses ("
+              + str(round(hit_rate, 1)) + "% reused)")
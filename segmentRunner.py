@@ -0,0 +1,236 @@
+import dataclasses
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import cv2
+
+from eventSinks import MemoryEventSink, MultiEventSink, TextEventSink
+from profiler import ProfiledVideoCapture, Profiler
+from videoEventWriter import VideoEventWriter
+from videoProcessor import ProcessingOptions, VideoSummary, configure_change_gating, configure_event_writer, \
+    configure_player_search, create_profiler, get_video_name, initialize_worker, materialise_event_clips, save_profile
+from videoStateMachine import State, VideoStateMachine
+
+# history of the event writer has to be refilled before a segment starts, so clips match a sequential run
+SEGMENT_WARM_UP_FRAMES = VideoEventWriter.BUF_SIZE
+MIN_SEGMENT_FRAMES = 4 * SEGMENT_WARM_UP_FRAMES
+
+# previous_state is only read by the unfinished scroll bar features, so it cannot change emitted events
+IGNORED_RESYNC_FIELDS = ["previous_state"]
+
+
+@dataclass
+class SegmentResult:
+    index: int
+    start: int
+    end: int
+    start_state: dict = None
+    end_state: dict = None
+    first_event_id: int = 1
+    events: list = field(default_factory=list)
+    frames_count: int = 0
+    profile: dict = None
+
+
+def get_segment_writer_name(video_name, index):
+    return video_name + "\\segment_" + str(index)
+
+
+def get_speculative_state(pilot_state):
+    # segments start somewhere inside the session, so the most common state is assumed and left to warm up
+    speculative_state = dict(pilot_state)
+    speculative_state.update({
+        "current_state": State.PLAYING_VIDEO.name,
+        "current_frames_skip_count": 0,
+        "times_loading_popup_visible": 0,
+        "times_loading_popup_not_visible": 0,
+        "current_img_diff_count": 0,
+        "skip_frame": False,
+        "is_full_screen": False,
+        "possible_loading_popup_appear_time": 0,
+        "possible_loading_popup_disappear_time": 0,
+    })
+    return speculative_state
+
+
+def are_states_synchronised(first_state, second_state):
+    if first_state is None or second_state is None:
+        return False
+
+    first_state = {name: value for name, value in first_state.items() if name not in IGNORED_RESYNC_FIELDS}
+    second_state = {name: value for name, value in second_state.items() if name not in IGNORED_RESYNC_FIELDS}
+    return first_state == second_state
+
+
+def analyse_segment(video_path, index, start, end, initial_state=None, is_exact=False, stop_on_video_found=False,
+                    options=None):
+    # steps are numbered by the index of the next frame, step 1 compares frames 0 and 1
+    video_name = get_video_name(video_path)
+    options = options or ProcessingOptions()
+    result = SegmentResult(index, start, end)
+
+    warm_up_start = start if start == 1 else max(1, start - SEGMENT_WARM_UP_FRAMES)
+    video = cv2.VideoCapture(video_path)
+    video.set(cv2.CAP_PROP_POS_FRAMES, warm_up_start - 1)
+    width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    event_records = MemoryEventSink()
+    stateMachine = VideoStateMachine()
+    stateMachine.initialize(width, height, video_name, io.StringIO(), get_segment_writer_name(video_name, index),
+                            [event_records], options.analysis_scale)
+    configure_player_search(stateMachine, options)
+    configure_change_gating(stateMachine, options)
+
+    event_writer = stateMachine.event_writer
+    configure_event_writer(event_writer, options, warm_up_start - 1)
+    profiler = create_profiler(options, stateMachine)
+    if profiler is not None:
+        video = ProfiledVideoCapture(video, profiler)
+
+    is_read, previous_frame = video.read(event_writer.get_free_frame_slot())
+
+    if initial_state is not None and not is_exact:
+        stateMachine.set_dynamic_state(initial_state)
+
+    step = warm_up_start
+    while is_read and step < end:
+        is_read, current_frame = video.read(event_writer.get_free_frame_slot(previous_frame))
+        if not is_read:
+            break
+
+        if step == start:
+            if is_exact and initial_state is not None:
+                stateMachine.set_dynamic_state(initial_state)
+
+            result.start_state = stateMachine.get_dynamic_state()
+            result.first_event_id = stateMachine.new_event_id
+
+        current_time = video.get(cv2.CAP_PROP_POS_MSEC)
+        if step < start and is_exact:
+            # the exact state is known already, frames are only needed for clip history
+            event_writer.receive_frame(previous_frame)
+        else:
+            stateMachine.run_current_state(previous_frame, current_frame, current_time)
+
+        # warm-up frames belong to the previous segment, they are not counted twice
+        if step >= start:
+            result.frames_count += 1
+        previous_frame = current_frame
+        step += 1
+
+        if stop_on_video_found and stateMachine.had_video_once:
+            break
+
+    result.end = step
+    result.end_state = stateMachine.get_dynamic_state()
+
+    # delayed clips of events from this segment still need frames after its end
+    while is_read and event_writer.requested_events:
+        event_writer.receive_frame(previous_frame)
+        is_read, previous_frame = video.read(event_writer.get_free_frame_slot(previous_frame))
+
+    video.release()
+    stateMachine.save_text_file()
+    result.events = event_records.events
+    materialise_event_clips(event_writer, video_path, profiler)
+    result.profile = profiler.records if profiler is not None else None
+    return result
+
+
+def get_segment_bounds(start, frames_count, segments_count):
+    steps_count = frames_count - start
+    segments_count = max(1, min(segments_count, steps_count // MIN_SEGMENT_FRAMES))
+    bounds = [start + int(steps_count * i / segments_count) for i in range(segments_count)]
+    return list(zip(bounds, bounds[1:] + [frames_count]))
+
+
+def stitch_segment_events(video_name, result, event_sink, new_event_id):
+    segment_directory = "out\\" + get_segment_writer_name(video_name, result.index)
+
+    for event in result.events:
+        if event.event_id < result.first_event_id:
+            continue
+
+        event_sink.write_event(dataclasses.replace(event, event_id=new_event_id))
+
+        clip_name = segment_directory + "\\" + str(event.event_id) + ".mp4"
+        if os.path.isfile(clip_name):
+            os.replace(clip_name, "out\\" + video_name + "\\" + str(new_event_id) + ".mp4")
+
+        new_event_id += 1
+
+    shutil.rmtree(segment_directory, ignore_errors=True)
+    return new_event_id
+
+
+def process_video_in_segments(video_path, segments_count, workers_count=0, options=None):
+    # events get new ids when segments are stitched, so every event keeps a clip of its own
+    options = dataclasses.replace(options or ProcessingOptions(), merge_clips=False)
+    video_name = get_video_name(video_path)
+    print("Work on " + video_name + " has started in segments... Please don't close the application.")
+    start_time = time.perf_counter()
+
+    video = cv2.VideoCapture(video_path)
+    frames_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    video.release()
+
+    if not os.path.isdir("out\\" + video_name):
+        os.mkdir("out\\" + video_name)
+
+    # the video contour has to be known before segments can start speculatively, so it is found sequentially
+    pilot_result = analyse_segment(video_path, 0, 1, frames_count, stop_on_video_found=True, options=options)
+    results = [pilot_result]
+    segment_bounds = get_segment_bounds(pilot_result.end, frames_count, segments_count)
+
+    if pilot_result.end < frames_count:
+        workers_count = workers_count if workers_count > 0 else os.cpu_count() or 1
+        speculative_state = get_speculative_state(pilot_result.end_state)
+
+        with ProcessPoolExecutor(max_workers=min(workers_count, len(segment_bounds)), initializer=initialize_worker) as executor:
+            futures = []
+            for index, (start, end) in enumerate(segment_bounds, 1):
+                initial_state = pilot_result.end_state if index == 1 else speculative_state
+                futures.append(executor.submit(analyse_segment, video_path, index, start, end, initial_state, index == 1,
+                                               False, options))
+
+            results += [future.result() for future in futures]
+
+    event_records = MemoryEventSink()
+    event_sink = MultiEventSink([TextEventSink(open("out\\" + video_name + "\\events.txt", "w+")), event_records])
+    new_event_id = 1
+    resynchronised_count = 0
+    repeated_results = []
+    processed_frames_count = 0
+
+    for i, result in enumerate(results):
+        if i > 0 and not are_states_synchronised(results[i - 1].end_state, result.start_state):
+            # speculative start state diverged from the real one, so the segment is repeated from the exact state
+            shutil.rmtree("out\\" + get_segment_writer_name(video_name, result.index), ignore_errors=True)
+            repeated_results.append(result)
+            result = analyse_segment(video_path, result.index, result.start, result.end, results[i - 1].end_state, True,
+                                     options=options)
+            results[i] = result
+            resynchronised_count += 1
+
+        processed_frames_count += result.frames_count
+        new_event_id = stitch_segment_events(video_name, result, event_sink, new_event_id)
+
+    event_sink.close()
+
+    profiler = Profiler() if options.profile else None
+    if profiler is not None:
+        # repeated segments are included, their work is part of the cost of the video
+        for result in results + repeated_results:
+            profiler.merge(result.profile)
+
+    print("Work on " + video_name + " has ended. " + str(len(results) - 1) + " segments, "
+          + str(resynchronised_count) + " repeated after state resynchronisation.")
+    summary = VideoSummary(video_path, video_name, processed_frames_count + 1, time.perf_counter() - start_time, new_event_id - 1,
+                           events=event_records.events)
+    save_profile(profiler, video_name, summary.wall_time)
+    return summary
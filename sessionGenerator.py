@@ -0,0 +1,124 @@
+import argparse
+
+import cv2
+import numpy as np
+
+import videoExtensions
+from frameLayout import REFERENCE_RESOLUTION, scale_place
+
+# seconds of the synthetic session at which its parts start
+PLAYER_APPEAR_TIME = 1.0
+PLAYING_START_TIME = 2.5
+LOADING_POPUP_TIME = 7.0
+PLAYING_RESUME_TIME = 10.0
+PLAYING_END_TIME = 15.0
+URL_CHANGE_TIME = 16.0
+FULL_SCREEN_TOGGLE_TIME = 17.5
+SESSION_DURATION = 20.0
+
+BACKGROUND_COLOUR = (200, 200, 200)
+
+# sizes of a 1920x1080 session in pixels, scaled with the height of the resolution
+LOADING_POPUP_RADIUS = 30
+LOADING_POPUP_THICKNESS = 4
+PLAYER_MOTION_STEP = 3
+
+# browser and camera places of a 1920x1080 session, scaled with resolution like the layout of detectors
+URL_TEXT_PLACE = [(130, 58)]
+FULL_SCREEN_ICON_PLACE = [(1270, 8), (1300, 18)]
+CAMERA_PLACE = [(1340, 0), (REFERENCE_RESOLUTION[0], 320)]
+
+
+def get_resolution_place(place, resolution):
+    return scale_place(place, resolution[0] / REFERENCE_RESOLUTION[0], resolution[1] / REFERENCE_RESOLUTION[1])
+
+
+def get_player_rectangle(resolution):
+    # player keeps the place it has in a 1920x1080 recording of the browser
+    width, height = resolution
+    return int(width * 200 / 1920), int(height * 250 / 1080), int(width * 1100 / 1920), int(height * 750 / 1080)
+
+
+def render_background(resolution, url):
+    width, height = resolution
+    text_scale = height / REFERENCE_RESOLUTION[1]
+    background = np.full((height, width, 3), BACKGROUND_COLOUR, np.uint8)
+    cv2.putText(background, url, get_resolution_place(URL_TEXT_PLACE, resolution)[0], cv2.FONT_HERSHEY_SIMPLEX,
+                0.5 * text_scale, (0, 0, 0), max(1, int(round(text_scale))))
+    return background
+
+
+def get_resolution_size(size, resolution):
+    return max(1, int(round(size * resolution[1] / REFERENCE_RESOLUTION[1])))
+
+
+def render_loading_popup(frame, player_rectangle, frame_index, resolution):
+    min_x, min_y, max_x, max_y = player_rectangle
+    center = ((min_x + max_x) // 2, (min_y + max_y) // 2)
+    radius = get_resolution_size(LOADING_POPUP_RADIUS, resolution)
+    cv2.ellipse(frame, center, (radius, radius), (frame_index * 20) % 360, 0, 270, (255, 255, 255),
+                get_resolution_size(LOADING_POPUP_THICKNESS, resolution))
+
+
+def render_session_frames(resolution=(1920, 1080), fps=30, seed=0):
+    width, height = resolution
+    random_generator = np.random.default_rng(seed)
+    min_x, min_y, max_x, max_y = player_rectangle = get_player_rectangle(resolution)
+    (camera_x, camera_y), (camera_width, camera_height) = get_resolution_place(CAMERA_PLACE, resolution)
+    full_screen_icon_place = get_resolution_place(FULL_SCREEN_ICON_PLACE, resolution)
+    player_motion_step = get_resolution_size(PLAYER_MOTION_STEP, resolution)
+
+    first_background = render_background(resolution, "www.youtube.com/watch?v=abc")
+    second_background = render_background(resolution, "www.example.org/some/other/page/with/long/url/text/here")
+    player_content = cv2.resize(random_generator.integers(0, 255, (50, 90, 3), np.uint8), (max_x - min_x, max_y - min_y),
+                                interpolation=cv2.INTER_NEAREST)
+
+    for frame_index in range(int(SESSION_DURATION * fps)):
+        time = frame_index / fps
+        frame = (first_background if time < URL_CHANGE_TIME else second_background).copy()
+
+        camera_noise = random_generator.integers(0, 255, (16, 29, 3), np.uint8)
+        frame[camera_y:camera_height, camera_x:camera_width] = cv2.resize(camera_noise, (camera_width - camera_x, camera_height - camera_y),
+                                                                          interpolation=cv2.INTER_NEAREST)
+
+        if time >= PLAYER_APPEAR_TIME:
+            cv2.rectangle(frame, (min_x, min_y), (max_x, max_y), (0, 0, 0), -1)
+
+        if PLAYING_START_TIME <= time < LOADING_POPUP_TIME or PLAYING_RESUME_TIME <= time < PLAYING_END_TIME:
+            player_content = np.roll(player_content, player_motion_step, axis=1)
+
+        if time >= PLAYING_START_TIME:
+            frame[min_y:max_y, min_x:max_x] = player_content
+
+        if LOADING_POPUP_TIME <= time < PLAYING_RESUME_TIME:
+            render_loading_popup(frame, player_rectangle, frame_index, resolution)
+
+        if time >= FULL_SCREEN_TOGGLE_TIME:
+            cv2.rectangle(frame, full_screen_icon_place[0], full_screen_icon_place[1], (0, 0, 0), -1)
+
+        yield frame
+
+
+def write_session_video(video_path, resolution=(1920, 1080), fps=30, seed=0):
+    video = cv2.VideoWriter(video_path, videoExtensions.FOURCC, fps, resolution)
+
+    for frame in render_session_frames(resolution, fps, seed):
+        video.write(frame)
+
+    video.release()
+
+
+def parse_resolution(text):
+    width, height = text.split("x")
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render a synthetic recorded YouTube session.")
+    parser.add_argument("video_path", help="path of the rendered video, e.g. VideoSources\\synthetic.mp4")
+    parser.add_argument("--resolution", type=parse_resolution, default=(1920, 1080), help="WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_session_video(args.video_path, args.resolution, args.fps, args.seed)
@@ -0,0 +1,104 @@
+import collections
+import dataclasses
+import os
+import time
+
+from eventSinks import MemoryEventSink
+from videoProcessor import ProcessingOptions, VideoSummary, configure_change_gating, configure_event_writer, \
+    configure_player_search, print_change_gating_report, print_clip_encoding_report
+from videoStateMachine import VideoStateMachine
+
+
+class StreamEventLog:
+    # events file is flushed after every event, so events can be followed while the stream is still analysed
+    FRAME_TIMES_SIZE = 3600
+
+    def __init__(self, file):
+        self.file = file
+        self.frame_times = collections.deque(maxlen=self.FRAME_TIMES_SIZE)
+        self.first_frame_time = None
+        self.event_lags = []
+
+    def receive_frame(self, frame_time):
+        receive_time = time.perf_counter()
+
+        if self.first_frame_time is None:
+            self.first_frame_time = (frame_time, receive_time)
+
+        # a frame can not be available later than it was received, nor later than its timestamp in a real time stream
+        first_frame_time, first_receive_time = self.first_frame_time
+        available_time = min(receive_time, first_receive_time + (frame_time - first_frame_time) / 1000)
+        self.frame_times.append((frame_time, available_time))
+
+    def get_available_time(self, event_time):
+        for frame_time, available_time in self.frame_times:
+            if frame_time >= event_time:
+                return available_time
+
+        return self.frame_times[0][1] if self.frame_times else time.perf_counter()
+
+    def write_event(self, event):
+        # text sink of the state machine is given events before this one
+        self.file.flush()
+
+        lag = time.perf_counter() - self.get_available_time(event.time)
+        self.event_lags.append(lag)
+        print("  event " + str(event.event_id) + " (" + event.title.rstrip(": ") + ") emitted "
+              + str(round(lag * 1000, 1)) + " ms after its frame")
+
+    def close(self):
+        pass
+
+    def print_report(self):
+        if self.event_lags:
+            print("  event lag: mean " + str(round(sum(self.event_lags) / len(self.event_lags) * 1000, 1)) + " ms, max "
+                  + str(round(max(self.event_lags) * 1000, 1)) + " ms")
+
+
+def process_stream(source, stream_name, options=None):
+    # sampled frames can not be analysed again and clips can not be cut from a source which is not kept
+    options = dataclasses.replace(options or ProcessingOptions(), adaptive_stride=False, lazy_clips=False)
+    print("Work on stream " + stream_name + " has started... Please don't close the application.")
+    start_time = time.perf_counter()
+
+    WIDTH, HEIGHT = source.resolution
+    os.makedirs("out\\" + stream_name, exist_ok=True)
+    text_file = open("out\\" + stream_name + "\\events.txt", "w+")
+    event_log = StreamEventLog(text_file)
+    event_records = MemoryEventSink()
+
+    stateMachine = VideoStateMachine()
+    stateMachine.initialize(WIDTH, HEIGHT, stream_name, text_file, event_sinks=[event_log, event_records],
+                            analysis_scale=options.analysis_scale)
+    configure_player_search(stateMachine, options)
+    configure_change_gating(stateMachine, options)
+
+    event_writer = stateMachine.event_writer
+    configure_event_writer(event_writer, options)
+    is_read, previous_frame = source.read(event_writer.get_free_frame_slot())
+    frames_count = 0
+
+    if is_read:
+        frames_count += 1
+        event_log.receive_frame(source.get_time())
+
+    while is_read:
+        is_read, current_frame = source.read(event_writer.get_free_frame_slot(previous_frame))
+
+        if is_read:
+            frames_count += 1
+            current_time = source.get_time()
+            event_log.receive_frame(current_time)
+            stateMachine.run_current_state(previous_frame, current_frame, current_time)
+            previous_frame = current_frame
+
+    stateMachine.save_text_file()
+    source.release()
+    print_clip_encoding_report(event_writer)
+    print_change_gating_report(stateMachine)
+    event_log.print_report()
+
+    summary = VideoSummary(stream_name, stream_name, frames_count, time.perf_counter() - start_time,
+                           stateMachine.new_event_id - 1, event_writer.get_history_memory_used(), event_records.events)
+    print("Work on stream " + stream_name + " has ended.")
+    return summary
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+
+import cv2
+
+
+class RawFrameStream:
+    # raw BGR frames of a known resolution, read from a pipe, a FIFO or standard input ("-")
+    def __init__(self, path, resolution, fps=60):
+        self.path = path
+        self.resolution = resolution
+        self.fps = fps
+        self.frames_read = 0
+        self.file = sys.stdin.buffer if path == "-" else open(path, "rb", buffering=0)
+
+    def read(self, image):
+        # frames are read straight into the given slot, pipes may return them in several parts
+        frame_view = memoryview(image).cast("B")
+        bytes_read = 0
+
+        while bytes_read < len(frame_view):
+            chunk_size = self.file.readinto(frame_view[bytes_read:])
+            if not chunk_size:
+                return False, None
+
+            bytes_read += chunk_size
+
+        self.frames_read += 1
+        return True, image
+
+    def get_time(self):
+        return (self.frames_read - 1) * 1000 / self.fps
+
+    def release(self):
+        if self.file is not sys.stdin.buffer:
+            self.file.close()
+
+
+class GrowingVideoStream:
+    # video file which may still be written, missing frames are waited for until the file stops growing
+    def __init__(self, path, poll_interval=0.5, idle_timeout=10.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.frames_read = 0
+        self.video = cv2.VideoCapture(path)
+        self.resolution = self.wait_for_first_frame()
+
+    def wait_for_first_frame(self):
+        # a recording may not exist yet or have no frame, its resolution is known only once the first frame is there
+        start_time = time.perf_counter()
+        is_read, frame = self.video.read()
+
+        while not is_read:
+            if time.perf_counter() - start_time >= self.idle_timeout:
+                self.video.release()
+                raise RuntimeError("No frame of " + self.path + " appeared within " + str(self.idle_timeout) + " seconds")
+
+            time.sleep(self.poll_interval)
+            self.reopen()
+            is_read, frame = self.video.read()
+
+        # the first frame is read again by the analysis
+        self.reopen()
+        return frame.shape[1], frame.shape[0]
+
+    def reopen(self):
+        # a capture does not see frames appended after it was opened, so it is opened again at the same frame
+        self.video.release()
+        self.video = cv2.VideoCapture(self.path)
+        self.video.set(cv2.CAP_PROP_POS_FRAMES, self.frames_read)
+
+    def read(self, image):
+        idle_start_time = time.perf_counter()
+        is_read, frame = self.video.read(image)
+
+        while not is_read and os.path.isfile(self.path) and time.perf_counter() - idle_start_time < self.idle_timeout:
+            time.sleep(self.poll_interval)
+            self.reopen()
+            is_read, frame = self.video.read(image)
+
+        if is_read:
+            self.frames_read += 1
+
+        return is_read, frame
+
+    def get_time(self):
+        return self.video.get(cv2.CAP_PROP_POS_MSEC)
+
+    def release(self):
+        self.video.release()
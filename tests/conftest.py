@@ -0,0 +1,13 @@
+import pytest
+
+import sessionGenerator
+
+# native 720p sessions give the same events as 1080p ones and are analysed in a few seconds
+SESSION_RESOLUTION = (1280, 720)
+
+
+@pytest.fixture(scope="session")
+def session_video_path(tmp_path_factory):
+    video_path = str(tmp_path_factory.mktemp("VideoSources") / "session.mp4")
+    sessionGenerator.write_session_video(video_path, SESSION_RESOLUTION)
+    return video_path
@@ -0,0 +1,68 @@
+import os
+
+import cv2
+import pytest
+
+import videoProcessor
+from videoProcessor import ProcessingOptions, process_video
+
+
+class AnalysisKilled(Exception):
+    pass
+
+
+def read_outputs(directory):
+    # events.txt and decoded frames of every clip written for the session
+    outputs = {}
+    for file_name in os.listdir(directory):
+        if not file_name.startswith("out\\session\\"):
+            continue
+
+        if file_name.endswith(".mp4"):
+            video = cv2.VideoCapture(os.path.join(directory, file_name))
+            frames = []
+            is_read, frame = video.read()
+            while is_read:
+                frames.append(frame.tobytes())
+                is_read, frame = video.read()
+            video.release()
+            outputs[file_name] = frames
+        else:
+            with open(os.path.join(directory, file_name)) as output_file:
+                outputs[file_name] = output_file.read()
+
+    return outputs
+
+
+def test_resumed_analysis_matches_uninterrupted_run(tmp_path, monkeypatch, session_video_path):
+    full_path = tmp_path / "full"
+    full_path.mkdir()
+    monkeypatch.chdir(full_path)
+    full_summary = process_video(session_video_path)
+
+    resumed_path = tmp_path / "resumed"
+    resumed_path.mkdir()
+    monkeypatch.chdir(resumed_path)
+    save_checkpoint = videoProcessor.save_checkpoint
+    saved_frames_counts = []
+
+    def save_checkpoint_and_kill(checkpoint, path):
+        save_checkpoint(checkpoint, path)
+        saved_frames_counts.append(checkpoint.frames_count)
+        raise AnalysisKilled()
+
+    monkeypatch.setattr(videoProcessor, "save_checkpoint", save_checkpoint_and_kill)
+    with pytest.raises(AnalysisKilled):
+        process_video(session_video_path, ProcessingOptions(checkpoint_interval=150))
+
+    # the session has events before and after the checkpoint, times of events are in milliseconds
+    checkpoint_time = saved_frames_counts[0] / 30 * 1000
+    assert full_summary.events[0].time < checkpoint_time < full_summary.events[-1].time
+
+    monkeypatch.setattr(videoProcessor, "save_checkpoint", save_checkpoint)
+    resumed_summary = process_video(session_video_path, ProcessingOptions(checkpoint_interval=150, resume=True))
+
+    assert resumed_summary.events == full_summary.events
+    assert resumed_summary.frames_count == full_summary.frames_count
+    assert read_outputs(resumed_path) == read_outputs(full_path)
+    assert not os.path.isfile(resumed_path / "out\\session\\checkpoint.json")
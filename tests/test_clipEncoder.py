@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+import videoExtensions
+from clipEncoder import ClipEncoder
+
+
+def save_or_fail(frames, video_path, resolution):
+    if video_path == "broken":
+        raise OSError("can not write " + video_path)
+
+
+def test_failed_clip_is_raised_by_flush(monkeypatch):
+    monkeypatch.setattr(videoExtensions, "save_video_event", save_or_fail)
+    clip_encoder = ClipEncoder(workers_count=2, queue_size=1)
+
+    for video_path in ["first", "broken", "last"]:
+        clip_encoder.submit([None], video_path, (32, 24))
+
+    with pytest.raises(OSError, match="broken"):
+        clip_encoder.flush()
+
+    # the workers keep encoding after the failure and the error is raised only once
+    clip_encoder.submit([None], "after", (32, 24))
+    clip_encoder.close()
+    assert sorted(clip.video_path for clip in clip_encoder.encoded_clips) == ["after", "first", "last"]
+
+
+def test_close_stops_workers_before_raising(monkeypatch):
+    monkeypatch.setattr(videoExtensions, "save_video_event", save_or_fail)
+    threads_count = threading.active_count()
+    clip_encoder = ClipEncoder(workers_count=2)
+    clip_encoder.submit([None], "broken", (32, 24))
+
+    with pytest.raises(OSError):
+        clip_encoder.close()
+
+    assert clip_encoder.workers == []
+    assert threading.active_count() == threads_count
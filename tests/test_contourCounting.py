@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+import pytest
+
+import videoExtensions
+from videoExtensions import DetectionType
+
+# thresholds of the detectors, next to the smallest ones where the pixel count shortcut decides alone
+MIN_COUNTS = [0, 1, 2, 4, 5, 30, 35, 101]
+THRESHOLD_VALUES = [5, 100]
+DETECTION_TYPES = [DetectionType.NORMAL, DetectionType.SMOOTH, DetectionType.HARD]
+
+
+def count_contours_before_shortcuts(gray_frame, detection_type, trs_value):
+    # copy of find_all_gray_contours of detectors before the shortcuts, contours were always extracted
+    modified_frame = cv2.threshold(gray_frame, trs_value, 255, cv2.THRESH_BINARY)[1]
+
+    if detection_type == DetectionType.HARD:
+        modified_frame = 255 - cv2.morphologyEx(modified_frame, cv2.MORPH_OPEN, np.ones((111, 111), np.uint8))
+
+    if detection_type == DetectionType.SMOOTH:
+        modified_frame = cv2.dilate(cv2.GaussianBlur(modified_frame, (5, 5), 0), None, iterations=4)
+
+    contours = cv2.findContours(modified_frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return len(contours[0] if len(contours) == 2 else contours[1])
+
+
+def get_edge_frames():
+    empty = np.zeros((60, 80), np.uint8)
+    single_pixel = empty.copy()
+    single_pixel[30, 40] = 255
+    corner_pixel = empty.copy()
+    corner_pixel[0, 0] = 255
+    touching_blobs = empty.copy()
+    touching_blobs[10:20, 10:20] = 255
+    touching_blobs[20:30, 20:30] = 255
+    touching_blobs[10:20, 30:40] = 255
+    nested_blobs = empty.copy()
+    cv2.rectangle(nested_blobs, (5, 5), (70, 50), 255, 2)
+    cv2.rectangle(nested_blobs, (20, 15), (50, 40), 255, 1)
+    nested_blobs[27, 35] = 255
+    sparse_pixels = empty.copy()
+    sparse_pixels[::4, ::4] = 255
+
+    return [empty, np.full((60, 80), 255, np.uint8), single_pixel, corner_pixel, touching_blobs, nested_blobs,
+            sparse_pixels]
+
+
+def get_random_gray_diffs():
+    # differences of random colour frames with noise and moving shapes, converted to gray the way detectors do it
+    random_generator = np.random.default_rng(0)
+    gray_diffs = []
+
+    for index in range(40):
+        previous_frame = np.full((120, 160, 3), 128, np.uint8)
+        next_frame = previous_frame.copy()
+        noise_ratio = random_generator.choice([0.0, 0.001, 0.01, 0.1, 0.5])
+        noise = random_generator.integers(0, 255, (120, 160, 3), np.uint8)
+        noise_mask = random_generator.random((120, 160)) < noise_ratio
+        next_frame[noise_mask] = noise[noise_mask]
+
+        for shape_index in range(random_generator.integers(0, 6)):
+            center = tuple(int(value) for value in random_generator.integers(0, (160, 120)))
+            colour = tuple(int(value) for value in random_generator.integers(0, 255, 3))
+            cv2.circle(next_frame, center, int(random_generator.integers(1, 40)), colour, int(random_generator.integers(-1, 4)))
+
+        gray_diffs.append(cv2.cvtColor(cv2.absdiff(previous_frame, next_frame), cv2.COLOR_BGR2GRAY))
+
+    return gray_diffs
+
+
+def assert_same_decisions(gray_frame, detection_type, trs_value):
+    contours_count = count_contours_before_shortcuts(gray_frame, detection_type, trs_value)
+    binary_frame = videoExtensions.apply_threshold(gray_frame, trs_value)
+    assert videoExtensions.count_all_contours(binary_frame, detection_type) == contours_count
+
+    for min_count in MIN_COUNTS:
+        assert videoExtensions.has_at_least_contours(binary_frame, detection_type, min_count) \
+            == (contours_count >= min_count)
+
+
+@pytest.mark.parametrize("trs_value", THRESHOLD_VALUES)
+@pytest.mark.parametrize("detection_type", DETECTION_TYPES)
+def test_edge_masks_are_decided_as_before(detection_type, trs_value):
+    for gray_frame in get_edge_frames():
+        assert_same_decisions(gray_frame, detection_type, trs_value)
+
+
+@pytest.mark.parametrize("trs_value", THRESHOLD_VALUES)
+@pytest.mark.parametrize("detection_type", DETECTION_TYPES)
+def test_random_differences_are_decided_as_before(detection_type, trs_value):
+    for gray_frame in get_random_gray_diffs():
+        assert_same_decisions(gray_frame, detection_type, trs_value)
@@ -0,0 +1,26 @@
+import json
+
+from eventIndex import index_summaries
+from eventPrinter import EventRecord, EventType
+from videoProcessor import VideoSummary
+
+
+def get_summary(video_name, events_count):
+    events = [EventRecord(event_id, EventType.URL_CHANGED, "URL changed: ", event_id * 1000.0)
+              for event_id in range(1, events_count + 1)]
+    return VideoSummary("VideoSources\\" + video_name + ".mp4", video_name, 600, 1.0, events_count, events=events)
+
+
+def read_corpus(path):
+    with open(path) as corpus_file:
+        return [(row["video"], row["event_id"]) for row in map(json.loads, corpus_file)]
+
+
+def test_analysed_again_video_replaces_its_lines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    corpus_path = str(tmp_path / "events.jsonl")
+    index_summaries([get_summary("first", 2), get_summary("second", 1)], corpus_path)
+    index_summaries([get_summary("first", 3), get_summary("third", 1)], corpus_path)
+    index_summaries([get_summary("second", 0)], corpus_path)
+
+    assert read_corpus(corpus_path) == [("first", 1), ("first", 2), ("first", 3), ("third", 1)]
@@ -0,0 +1,26 @@
+import os
+
+from featureTrace import TraceEventWriter, get_trace_path, load_trace, replay_trace
+from videoProcessor import ProcessingOptions, process_video
+
+
+def test_replayed_trace_gives_events_of_the_live_run(tmp_path, monkeypatch, session_video_path):
+    monkeypatch.chdir(tmp_path)
+    summary = process_video(session_video_path, ProcessingOptions(lazy_clips=True, record_features=True))
+    trace = load_trace(get_trace_path("session"))
+
+    # replay happens somewhere else and leaves no output catalogue behind
+    replay_path = tmp_path / "replay"
+    replay_path.mkdir()
+    monkeypatch.chdir(replay_path)
+    events = replay_trace(trace)
+
+    assert len(summary.events) == 5
+    assert events == summary.events
+    assert os.listdir(replay_path) == []
+
+
+def test_trace_event_writers_do_not_share_requests():
+    first_writer, second_writer = TraceEventWriter(), TraceEventWriter()
+    first_writer.requested_events.append(1)
+    assert second_writer.requested_events == []
@@ -0,0 +1,51 @@
+import glob
+import os
+import shutil
+
+import resultCache
+from resultCache import get_configuration_key
+from videoProcessor import ProcessingOptions
+
+
+def test_key_depends_on_run_mode():
+    options = ProcessingOptions()
+    keys = {get_configuration_key(options), get_configuration_key(options, segments_count=4),
+            get_configuration_key(options, multi_stream=True)}
+    assert len(keys) == 3
+
+
+def test_key_depends_on_calibration_content(tmp_path):
+    calibration_path = tmp_path / "calibration.json"
+    options = ProcessingOptions(player_calibration_path=str(calibration_path))
+    missing_key = get_configuration_key(options)
+
+    calibration_path.write_text('{"1920x1080@1.0": [[200, 250]]}')
+    first_key = get_configuration_key(options)
+    calibration_path.write_text('{"1920x1080@1.0": [[201, 250]]}')
+    second_key = get_configuration_key(options)
+
+    assert len({missing_key, first_key, second_key}) == 3
+    assert get_configuration_key(options) == second_key
+
+
+def copy_package(package_path):
+    package_path.mkdir()
+    for module_path in glob.glob(os.path.join(os.path.dirname(resultCache.__file__), "*.py")):
+        shutil.copy(module_path, package_path)
+    return package_path
+
+
+def test_key_depends_on_every_module(tmp_path, monkeypatch):
+    options = ProcessingOptions()
+    package_path = copy_package(tmp_path / "package")
+    monkeypatch.setattr(resultCache, "__file__", str(package_path / "resultCache.py"))
+    key = get_configuration_key(options)
+
+    # modules which are not detectors still change results, e.g. stitching of segments
+    for module_name in ["segmentRunner.py", "multiStreamEngine.py", "eventSinks.py", "playerCalibration.py"]:
+        with open(package_path / module_name, "a") as module_file:
+            module_file.write("\n")
+
+        changed_key = get_configuration_key(options)
+        assert changed_key != key
+        key = changed_key
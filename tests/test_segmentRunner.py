@@ -0,0 +1,12 @@
+from segmentRunner import process_video_in_segments
+from videoProcessor import ProcessingOptions, process_video
+
+
+def test_segments_count_every_frame_once(tmp_path, monkeypatch, session_video_path):
+    monkeypatch.chdir(tmp_path)
+    sequential_summary = process_video(session_video_path, ProcessingOptions(lazy_clips=True))
+    segmented_summary = process_video_in_segments(session_video_path, 2, 1, ProcessingOptions(lazy_clips=True))
+
+    # warm-up frames of a segment are analysed again but belong to the segment before it
+    assert segmented_summary.frames_count == sequential_summary.frames_count == 600
+    assert segmented_summary.events == sequential_summary.events
@@ -0,0 +1,26 @@
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+from streamSources import GrowingVideoStream
+
+
+def test_missing_recording_is_reported_after_the_timeout(tmp_path):
+    with pytest.raises(RuntimeError, match="No frame"):
+        GrowingVideoStream(str(tmp_path / "missing.mp4"), poll_interval=0.05, idle_timeout=0.3)
+
+
+def test_resolution_is_read_once_the_recording_appears(tmp_path, session_video_path):
+    video_path = str(tmp_path / "recording.mp4")
+    copy_timer = threading.Timer(0.3, shutil.copy, (session_video_path, video_path))
+    copy_timer.start()
+
+    stream = GrowingVideoStream(video_path, poll_interval=0.05, idle_timeout=5.0)
+    copy_timer.join()
+    is_read, frame = stream.read(np.zeros((720, 1280, 3), np.uint8))
+    stream.release()
+
+    assert stream.resolution == (1280, 720)
+    assert is_read and stream.frames_read == 1
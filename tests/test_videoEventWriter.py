@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import videoExtensions
+from frameHistory import CompressedFrameHistory, FrameRingBuffer
+from videoEventWriter import VideoEventWriter
+
+RESOLUTION = (32, 24)
+FRAMES_COUNT = 400
+
+# instant clips with their offsets and delayed clips, at numbers of received frames
+INSTANT_CLIPS = {130: 50, 140: 20, 260: 0, 300: 55}
+DELAYED_CLIPS = [150, 170, 330]
+
+
+def get_frame(index):
+    frame = np.zeros((RESOLUTION[1], RESOLUTION[0], 3), np.uint8)
+    frame[0, 0] = (index % 256, index // 256, 0)
+    return frame
+
+
+def get_frame_index(frame):
+    return int(frame[0, 0, 0]) + 256 * int(frame[0, 0, 1])
+
+
+def write_clips(monkeypatch, history, is_merged):
+    written = {}
+    monkeypatch.setattr(videoExtensions, "save_video_event",
+                        lambda frames, path, resolution: written.__setitem__(path, [get_frame_index(f) for f in frames]))
+
+    event_writer = VideoEventWriter("video", RESOLUTION)
+    event_writer.frame_history = history
+    if is_merged:
+        event_writer.clip_segments = []
+        event_writer.pending_clips = []
+
+    for index in range(FRAMES_COUNT):
+        event_writer.receive_frame(get_frame(index))
+
+        if index in INSTANT_CLIPS:
+            event_writer.request_instant_event_write("i" + str(index), INSTANT_CLIPS[index])
+        if index in DELAYED_CLIPS:
+            event_writer.request_event_write("d" + str(index))
+
+    event_writer.flush()
+    return written, event_writer.clip_segments
+
+
+def get_history(history_kind):
+    if history_kind == "raw":
+        return FrameRingBuffer(VideoEventWriter.BUF_SIZE, RESOLUTION)
+
+    # lossless frames make every kept frame recognisable after decoding
+    frame_size = CompressedFrameHistory(1, RESOLUTION, ".png").encode_frame(get_frame(0)).nbytes
+    memory_budget = frame_size * 15 if history_kind == "budget" else 0
+    return CompressedFrameHistory(VideoEventWriter.BUF_SIZE, RESOLUTION, ".png", memory_budget=memory_budget)
+
+
+@pytest.mark.parametrize("history_kind", ["raw", "png", "budget"])
+def test_merged_segments_hold_frames_of_every_event_clip(tmp_path, monkeypatch, history_kind):
+    monkeypatch.chdir(tmp_path)
+    event_clips, unused = write_clips(monkeypatch, get_history(history_kind), False)
+    segments, clip_segments = write_clips(monkeypatch, get_history(history_kind), True)
+
+    if history_kind != "budget":
+        assert len(segments) < len(event_clips)
+    assert {entry.event_id for entry in clip_segments} == {path.split("\\")[-1][:-4] for path in event_clips}
+
+    for entry in clip_segments:
+        event_frames = event_clips["out\\video\\" + entry.event_id + ".mp4"]
+        assert segments[entry.segment_path][entry.start:entry.stop] == event_frames
+        assert 0 <= entry.start <= entry.stop <= len(segments[entry.segment_path])
+
+
+def test_budget_drops_frames_before_the_history_is_full(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    segments, clip_segments = write_clips(monkeypatch, get_history("budget"), True)
+
+    # only the newest frames are kept, so segments are written right after their clips are requested
+    assert any(segments.values())
+    assert all(len(segment_frames) <= 15 for segment_frames in segments.values())
+    assert all(entry.stop <= len(segments[entry.segment_path]) for entry in clip_segments)
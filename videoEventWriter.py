@@ -1,7 +1,10 @@
 import os
 import string
 import videoExtensions
+from clipExtractor import ClipWindow
+from clipSegments import ClipSegmentEntry, get_clip_index_path, get_segment_path, save_clip_index
 from dataclasses import dataclass
+from frameHistory import FrameRingBuffer
 
 
 class VideoEventWriter:
@@ -11,34 +14,71 @@ class VideoEventWriter:
     video_name = ""
     video_resolution = ()
 
-    current_frames = []
-    requested_events = []
+    frame_history = None
+    requested_events = None
+    clip_encoder = None
+    clip_windows = None
+    clip_segments = None
+    pending_clips = None
+    received_frames_count = 0
+    skipped_event_types = ()
 
     def __init__(self, name, resolution):
         self.video_name = name
         self.video_resolution = resolution
+        self.requested_events = []
         new_directory_name = "out\\" + name
 
         if not os.path.isdir(new_directory_name):
             os.mkdir("out\\" + name)
 
-    def request_event_write(self, event_id, delay=-1):
+    def request_event_write(self, event_id, delay=-1, event_type=None):
+        if event_type in self.skipped_event_types:
+            return
+
         if delay < 0:
             delay = int(self.event_video_frames_size / 2)
 
         event_data = EventData(delay, event_id)
         self.requested_events.append(event_data)
 
-    def request_instant_event_write(self, event_id, offset=0):
+    def request_instant_event_write(self, event_id, offset=0, event_type=None):
+        if event_type in self.skipped_event_types:
+            return
+
         self.instant_save_video(event_id, offset)
 
+    def get_frame_history(self):
+        # history is created on first use, so another kind of history can be set after construction
+        if self.frame_history is None:
+            self.frame_history = FrameRingBuffer(self.BUF_SIZE, self.video_resolution)
+
+        return self.frame_history
+
+    def get_history_memory_used(self):
+        return self.get_frame_history().get_memory_used()
+
+    def get_free_frame_slot(self, *frames_in_use):
+        return self.get_frame_history().get_free_frame_slot(*frames_in_use)
+
     def receive_frame(self, frame):
-        if len(self.current_frames) == self.BUF_SIZE:
-            self.current_frames.pop(0)
+        # a merged segment is written before its first frame leaves the history
+        if self.pending_clips and self.is_oldest_frame_dropped_next() \
+                and min(start for event_id, start, stop in self.pending_clips) <= self.get_oldest_kept_index():
+            self.write_clip_segment()
 
-        self.current_frames.append(frame)
+        self.get_frame_history().receive_frame(frame)
+        self.received_frames_count += 1
         self.decrease_event_counters()
 
+    def get_oldest_kept_index(self):
+        return self.received_frames_count - self.get_frame_history().get_kept_frames_count()
+
+    def is_oldest_frame_dropped_next(self):
+        # a full history drops its oldest frame with the next one, a memory budget may drop it at any frame
+        history = self.get_frame_history()
+        return len(history) == self.BUF_SIZE or history.get_kept_frames_count() < len(history)
+
     def decrease_event_counters(self):
         for event_data in self.requested_events:
             event_data.frames_left -= 1
@@ -48,14 +88,78 @@ class VideoEventWriter:
                 self.requested_events.remove(event_data)
 
     def save_video(self, event_id):
-        full_video_name = "out\\" + self.video_name + "\\" + event_id + ".mp4"
-        video_frames = self.current_frames[self.BUF_SIZE - 1 - self.event_video_frames_size:self.BUF_SIZE - 1]
-        videoExtensions.save_video_event(video_frames, full_video_name, self.video_resolution)
+        self.write_event_clip(event_id, self.BUF_SIZE - 1 - self.event_video_frames_size, self.BUF_SIZE - 1)
 
     def instant_save_video(self, event_id, offset=0):
-        full_video_name = "out\\" + self.video_name + "\\" + event_id + ".mp4"
-        video_frames = self.current_frames[offset:self.event_video_frames_size + offset]
-        videoExtensions.save_video_event(video_frames, full_video_name, self.video_resolution)
+        self.write_event_clip(event_id, offset, self.event_video_frames_size + offset)
+
+    def write_event_clip(self, event_id, start, stop):
+        if self.clip_segments is None:
+            full_video_name = "out\\" + self.video_name + "\\" + event_id + ".mp4"
+            self.write_video_event(start, stop, full_video_name)
+            return
+
+        # clips are kept as numbers of received frames, so clips written later can still join their segment
+        history_length = len(self.get_frame_history())
+        first_index = self.received_frames_count - history_length
+        start, stop, step = slice(start, stop).indices(history_length)
+        start, stop = first_index + start, first_index + max(start, stop)
+
+        if self.pending_clips and (start > max(clip_stop for event_id, clip_start, clip_stop in self.pending_clips)
+                                   or stop < min(clip_start for event_id, clip_start, clip_stop in self.pending_clips)):
+            self.write_clip_segment()
+
+        self.pending_clips.append((event_id, start, stop))
+
+    def write_clip_segment(self):
+        # overlapping clips are encoded once, the index keeps the range of every event within the segment
+        # frames already dropped by a memory budget are left out, ranges of events follow the frames written
+        segment_start = max(min(start for event_id, start, stop in self.pending_clips), self.get_oldest_kept_index())
+        segment_stop = max(segment_start, max(stop for event_id, start, stop in self.pending_clips))
+        segment_path = get_segment_path(self.video_name, self.pending_clips[0][0])
+        first_index = self.received_frames_count - len(self.get_frame_history())
+        self.write_video_event(segment_start - first_index, segment_stop - first_index, segment_path)
+
+        for event_id, start, stop in self.pending_clips:
+            start, stop = max(start, segment_start), max(stop, segment_start)
+            self.clip_segments.append(ClipSegmentEntry(event_id, segment_path, start - segment_start, stop - segment_start))
+
+        self.pending_clips = []
+
+    def has_pending_clips(self):
+        return bool(self.requested_events or self.pending_clips)
+
+    def write_video_event(self, start, stop, full_video_name):
+        if self.clip_windows is not None:
+            # history keeps only frame numbers, the clip is cut from the source video after analysis
+            frame_numbers = self.get_frame_history().get_frames(start, stop)
+            clip_window = ClipWindow(full_video_name, frame_numbers[0], frame_numbers[-1] + 1) if frame_numbers \
+                else ClipWindow(full_video_name, 0, 0)
+            self.clip_windows.append(clip_window)
+            return
+
+        if self.clip_encoder is None:
+            video_frames = self.get_frame_history().get_frames(start, stop)
+            videoExtensions.save_video_event(video_frames, full_video_name, self.video_resolution)
+            return
+
+        # history is reused while the clip waits for encoding, so the encoder gets its own copy of frames
+        video_frames = self.get_frame_history().get_frames_copy(start, stop)
+        self.clip_encoder.submit(video_frames, full_video_name, self.video_resolution)
+
+    def enable_profiling(self, profiler):
+        # with a clip encoder only copying and queueing of clips is measured here
+        self.write_video_event = profiler.wrap("clip_write", self.write_video_event)
+
+    def flush(self):
+        if self.clip_segments is not None:
+            if self.pending_clips:
+                self.write_clip_segment()
+
+            save_clip_index(self.clip_segments, get_clip_index_path(self.video_name))
+
+        if self.clip_encoder is not None:
+            self.clip_encoder.close()
 
 
 @dataclass
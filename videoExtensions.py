@@ -3,12 +3,32 @@ from enum import Enum
 import numpy as np
 import cv2
 
+from frameLayout import FrameLayout
+
 # global parameters
 BLACK = [0, 0, 0]
 WHITE = [255, 255, 255]
 DEBUG_COLOR = [0, 255, 0]
 FOURCC = cv2.VideoWriter_fourcc('m', 'p', '4', 'v')
 
+# contour detection parameters for 1080p frames
+HARD_KERNEL_SIZE = 111
+SMOOTH_BLUR_SIZE = 5
+SMOOTH_DILATE_ITERATIONS = 4
+CONTOUR_MERGE_DISTANCE = 200
+
+# contour counts of detectors for 1080p frames, counts inside the player follow the analysis scale
+URL_BAR_MIN_CONTOURS = 30
+FULL_SCREEN_MIN_CONTOURS = 1
+PLAYING_MIN_CONTOURS = 100
+NO_POPUP_MIN_CONTOURS = 35
+POPUP_MAX_CONTOURS = 4
+MAX_NO_POPUP_DIFF_COUNT = 3
+
+# a calibrated player is checked on points this far outside of its edges
+PLAYER_EDGE_OFFSET = 8
+PLAYER_EDGE_SAMPLES = 5
+
 
 class DetectionType(Enum):
     NORMAL = 0
@@ -16,32 +36,270 @@ class DetectionType(Enum):
     HARD = 2
 
 
-def has_url_bar_changed(previous_frame, next_frame):
-    upper_left_point = (120, 45)
-    lower_right_point = (1300, 60)
-    img_diff = get_img_diff_between_frames(previous_frame, next_frame, [upper_left_point, lower_right_point])
-    contours = find_all_contours(img_diff, DetectionType.NORMAL, 100)
+class ChangeGate:
+    # counts detector evaluations skipped because their region is the same on both frames
+    def __init__(self):
+        self.evaluated_counts = {}
+        self.gated_counts = {}
+
+    def count(self, detector_name, is_gated):
+        counts = self.gated_counts if is_gated else self.evaluated_counts
+        counts[detector_name] = counts.get(detector_name, 0) + 1
+
+    def print_report(self):
+        for detector_name in sorted(set(self.evaluated_counts) | set(self.gated_counts)):
+            gated_count = self.gated_counts.get(detector_name, 0)
+            checks_count = gated_count + self.evaluated_counts.get(detector_name, 0)
+            print("  change gating: " + detector_name + " skipped " + str(gated_count) + " of " + str(checks_count)
+                  + " (" + str(round(gated_count / checks_count * 100, 1)) + "%)")
+
+
+class FrameBuffers:
+    # images reused by detectors of consecutive frames, the player keeps its size while it is watched
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, shape):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self.buffers[name] = np.empty(shape, np.uint8)
+
+        return buffer
+
+
+class FrameContext:
+    # shares grayscale conversions and frame differences between all detectors run for one pair of frames
+    def __init__(self, previous_frame, next_frame, layout=None, previous_context=None, gray_diff=None, change_gate=None):
+        self.previous_frame = previous_frame
+        self.next_frame = next_frame
+        self.layout = layout or FrameLayout((previous_frame.shape[1], previous_frame.shape[0]))
+
+        self.previous_analysis_frame = None
+        self.next_analysis_frame = None
+        self.previous_gray = None
+
+        # a difference computed for many streams at once can be given in advance
+        self.gray_diff = gray_diff
+        self.buffers = previous_context.buffers if previous_context is not None else FrameBuffers()
+
+        # regions compared between both frames, shared by detectors looking at the same place
+        self.change_gate = change_gate
+        self.unchanged_regions = {}
+
+        # the next frame of the previous pair is usually the previous frame of this one, so it is scaled only once
+        if previous_context is not None and previous_context.next_frame is previous_frame \
+                and previous_context.layout is self.layout:
+            self.previous_analysis_frame = previous_context.next_analysis_frame
+
+    def get_previous_analysis_frame(self):
+        if self.previous_analysis_frame is None:
+            self.previous_analysis_frame = self.layout.get_analysis_frame(self.previous_frame)
+
+        return self.previous_analysis_frame
+
+    def get_next_analysis_frame(self):
+        if self.next_analysis_frame is None:
+            self.next_analysis_frame = self.layout.get_analysis_frame(self.next_frame)
+
+        return self.next_analysis_frame
+
+    def get_previous_gray(self):
+        if self.previous_gray is None:
+            self.previous_gray = apply_grayscale(self.get_previous_analysis_frame())
+
+        return self.previous_gray
+
+    def get_gray_diff(self):
+        if self.gray_diff is None:
+            self.gray_diff = apply_grayscale(cv2.absdiff(self.get_previous_analysis_frame(), self.get_next_analysis_frame()))
+
+        return self.gray_diff
+
+    def get_full_frame_gray_diff(self, place):
+        # small places are compared on their own until the whole difference is needed by another detector
+        if self.gray_diff is not None and not self.layout.is_scaled():
+            return get_contour_img(self.gray_diff, place)
+
+        return apply_grayscale(cv2.absdiff(get_contour_img(self.previous_frame, place), get_contour_img(self.next_frame, place)))
+
+    def is_region_unchanged(self, detector_name, place, is_full_frame=False):
+        if self.change_gate is None:
+            return False
+
+        region_key = (is_full_frame,) + tuple(find_min_max_coordinates(place))
+        if region_key not in self.unchanged_regions:
+            if is_full_frame:
+                previous_frame, next_frame = self.previous_frame, self.next_frame
+            else:
+                previous_frame, next_frame = self.get_previous_analysis_frame(), self.get_next_analysis_frame()
+
+            self.unchanged_regions[region_key] = are_images_same(get_contour_img(previous_frame, place),
+                                                                 get_contour_img(next_frame, place))
+
+        is_unchanged = self.unchanged_regions[region_key]
+        self.change_gate.count(detector_name, is_unchanged)
+        return is_unchanged
+
+    def get_url_bar_binary_diff(self):
+        return apply_threshold(self.get_full_frame_gray_diff(self.layout.url_bar_place), 100)
+
+    def get_full_screen_binary_diff(self):
+        return apply_threshold(self.get_full_frame_gray_diff(self.layout.full_screen_button_place), 5)
+
+    def get_playing_binary_diff(self, contour):
+        return apply_threshold(get_contour_img(self.get_gray_diff(), contour), 5)
+
+    def get_player_binary_diff(self, contour):
+        # only the player is compared, the whole difference is cropped if another detector needed it already
+        previous_img = get_contour_img(self.get_previous_analysis_frame(), contour)
+        binary_diff = self.buffers.get("player_binary_diff", previous_img.shape[:2])
+
+        if self.gray_diff is not None:
+            cv2.threshold(get_contour_img(self.gray_diff, contour), 5, 255, cv2.THRESH_BINARY, binary_diff)
+        else:
+            color_diff = self.buffers.get("player_color_diff", previous_img.shape)
+            cv2.absdiff(previous_img, get_contour_img(self.get_next_analysis_frame(), contour), color_diff)
+            cv2.cvtColor(color_diff, cv2.COLOR_BGR2GRAY, binary_diff)
+            cv2.threshold(binary_diff, 5, 255, cv2.THRESH_BINARY, binary_diff)
+
+        # camera place is painted the same way on both frames, so no difference is left in it
+        min_x, max_x, min_y, max_y = find_min_max_coordinates(contour)
+        paint_no_camera_place(binary_diff, [(int(x - min_x), int(y - min_y)) for x, y in self.layout.camera_place], 0)
+        return binary_diff
+
+    def get_popup_binary_diffs(self, contour):
+        painted_popup_img = self.get_player_binary_diff(contour)
+
+        # popup place is kept before it is painted over, the same way painted colour passes the threshold
+        min_x, max_x, min_y, max_y = find_min_max_coordinates(contour)
+        popup_place_img = get_contour_img(painted_popup_img, np.asarray(contour) - (min_x, min_y), 0.1, 0.2)
+        popup_img = self.buffers.get("popup_binary_diff", popup_place_img.shape)
+        np.copyto(popup_img, popup_place_img)
+
+        paint_img_popup_place(painted_popup_img, contour, 0.1, 0.2, (min_x, min_y), 255)
+        return painted_popup_img, popup_img
+
+    def has_url_bar_changed(self):
+        # no difference gives no contours, so unchanged places are not thresholded at all
+        if self.is_region_unchanged("has_url_bar_changed", self.layout.url_bar_place, True):
+            return False
+
+        return has_at_least_contours(self.get_url_bar_binary_diff(), DetectionType.NORMAL, URL_BAR_MIN_CONTOURS)
+
+    def is_full_screen_toggled(self):
+        if self.is_region_unchanged("is_full_screen_toggled", self.layout.full_screen_button_place, True):
+            return False
+
+        return has_at_least_contours(self.get_full_screen_binary_diff(), DetectionType.NORMAL, FULL_SCREEN_MIN_CONTOURS)
+
+    def is_video_playing(self, contour):
+        if self.is_region_unchanged("is_video_playing", contour):
+            return False
+
+        return has_at_least_contours(self.get_playing_binary_diff(contour), DetectionType.NORMAL,
+                                     self.layout.scale_count(PLAYING_MIN_CONTOURS) + 1)
+
+    def get_loading_popup_features(self, contour):
+        min_no_popup_contours = self.layout.scale_count(NO_POPUP_MIN_CONTOURS)
+
+        # painted popup place alone is a single contour, so an unchanged player has neither difference nor popup
+        if min_no_popup_contours > 1 and self.is_region_unchanged("is_loading_popup_visible", contour):
+            return False, False
+
+        painted_popup_img, popup_img = self.get_popup_binary_diffs(contour)
+        has_no_popup_diff = has_at_least_contours(painted_popup_img, DetectionType.NORMAL, min_no_popup_contours)
+        is_visible = 0 < count_all_contours(popup_img, DetectionType.SMOOTH, self.layout.pixel_scale) <= POPUP_MAX_CONTOURS
+
+        return is_visible, has_no_popup_diff
+
+    def is_loading_popup_visible(self, contour, img_diff_count):
+        is_visible, has_no_popup_diff = self.get_loading_popup_features(contour)
+        return get_loading_popup_result(is_visible, has_no_popup_diff, img_diff_count)
+
+    # complete contour counts of detectors, recorded to replay them with other thresholds
+    def count_url_bar_contours(self):
+        return count_all_contours(self.get_url_bar_binary_diff(), DetectionType.NORMAL)
+
+    def count_full_screen_contours(self):
+        return count_all_contours(self.get_full_screen_binary_diff(), DetectionType.NORMAL)
+
+    def count_playing_contours(self, contour):
+        return count_all_contours(self.get_playing_binary_diff(contour), DetectionType.NORMAL)
+
+    def count_popup_contours(self, contour):
+        painted_popup_img, popup_img = self.get_popup_binary_diffs(contour)
+        return count_all_contours(painted_popup_img, DetectionType.NORMAL), \
+            count_all_contours(popup_img, DetectionType.SMOOTH, self.layout.pixel_scale)
+
+    def find_biggest_contour(self, search_scale=1.0):
+        if search_scale == 1.0:
+            all_contours = find_all_gray_contours(self.get_previous_gray(), DetectionType.HARD, 0, self.layout.pixel_scale)
+            return max(all_contours, key=cv2.contourArea)
+
+        # opening is searched on a smaller frame, found contour is only a few pixels off on the analysis frame
+        search_gray = cv2.resize(self.get_previous_gray(), None, fx=search_scale, fy=search_scale,
+                                 interpolation=cv2.INTER_NEAREST)
+        all_contours = find_all_gray_contours(search_gray, DetectionType.HARD, 0, self.layout.pixel_scale * search_scale)
+        biggest_contour = max(all_contours, key=cv2.contourArea)
+        return np.round(biggest_contour / search_scale).astype(biggest_contour.dtype)
+
+    def is_player_in_place(self, contour):
+        edge_offset = max(1, int(round(self.layout.scale_length(PLAYER_EDGE_OFFSET))))
+        return is_player_in_place(self.get_previous_analysis_frame(), contour, edge_offset)
 
-    return len(contours) >= 30
+    def is_video_initializing(self, contour, grid_check_size=10):
+        return is_video_initializing(self.get_previous_analysis_frame(), contour, grid_check_size)
+
+
+def has_url_bar_changed(previous_frame, next_frame):
+    return FrameContext(previous_frame, next_frame).has_url_bar_changed()
 
 
 def is_full_screen_toggled(previous_frame, next_frame):
-    upper_left_point = (1260, 5)
-    lower_right_point = (1315, 20)
-    img_diff = get_img_diff_between_frames(previous_frame, next_frame, [upper_left_point, lower_right_point])
-    contours = find_all_contours(img_diff, DetectionType.NORMAL)
+    return FrameContext(previous_frame, next_frame).is_full_screen_toggled()
+
+
+def find_all_contours(frame, detection_type, trs_value=5, pixel_scale=1.0):
+    return find_all_gray_contours(apply_grayscale(frame), detection_type, trs_value, pixel_scale)
+
+
+def find_all_gray_contours(gray_frame, detection_type, trs_value=5, pixel_scale=1.0):
+    return find_all_binary_contours(apply_threshold(gray_frame, trs_value), detection_type, pixel_scale)
 
-    return len(contours) > 0
 
+def count_all_contours(binary_frame, detection_type, pixel_scale=1.0):
+    # every contour contains a non zero pixel and smoothing only merges them, so empty differences are skipped
+    if detection_type != DetectionType.HARD and cv2.countNonZero(binary_frame) == 0:
+        return 0
+
+    return len(find_all_binary_contours(binary_frame, detection_type, pixel_scale))
+
+
+def has_at_least_contours(binary_frame, detection_type, min_count, pixel_scale=1.0):
+    if detection_type != DetectionType.HARD:
+        # there can not be more contours than non zero pixels
+        non_zero_count = cv2.countNonZero(binary_frame)
+        if non_zero_count < min_count:
+            return False
+
+        if min_count <= 1:
+            return True
 
-def find_all_contours(frame, detection_type, trs_value=5):
-    modified_frame = frame
-    modified_frame = apply_grayscale(modified_frame)
-    modified_frame = apply_threshold(modified_frame, trs_value)
+    return len(find_all_binary_contours(binary_frame, detection_type, pixel_scale)) >= min_count
+
+
+def get_scaled_kernel_size(size, pixel_scale):
+    # kernels keep an odd size, so they stay centred
+    return max(3, int(round(size * pixel_scale)) | 1)
+
+
+def find_all_binary_contours(binary_frame, detection_type, pixel_scale=1.0):
+    modified_frame = binary_frame
 
     if detection_type == DetectionType.HARD:
         # applying close morphology
-        kernel = np.ones((111, 111), np.uint8)
+        kernel_size = get_scaled_kernel_size(HARD_KERNEL_SIZE, pixel_scale)
+        kernel = np.ones((kernel_size, kernel_size), np.uint8)
         modified_frame = cv2.morphologyEx(modified_frame, cv2.MORPH_OPEN, kernel)
 
         # inverting colours
@@ -49,10 +307,11 @@ def find_all_contours(frame, detection_type, trs_value=5):
 
     if detection_type == DetectionType.SMOOTH:
         # blur image for smoothing sharp edges
-        modified_frame = cv2.GaussianBlur(modified_frame, (5, 5), 0)
+        blur_size = get_scaled_kernel_size(SMOOTH_BLUR_SIZE, pixel_scale)
+        modified_frame = cv2.GaussianBlur(modified_frame, (blur_size, blur_size), 0)
 
         #  dilation for noise and imperfections removal
-        modified_frame = cv2.dilate(modified_frame, None, iterations=4)
+        modified_frame = cv2.dilate(modified_frame, None, iterations=max(1, int(round(SMOOTH_DILATE_ITERATIONS * pixel_scale))))
 
     contours = cv2.findContours(modified_frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     contours = contours[0] if len(contours) == 2 else contours[1]
@@ -72,49 +331,78 @@ def apply_threshold(image, min_thresh=0):
 
 
 def find_biggest_contour(frame):
-    all_contours = find_all_contours(frame, DetectionType.HARD, 0)
-    return max(all_contours, key=cv2.contourArea)
+    return FrameContext(frame, frame).find_biggest_contour()
 
 
-def simplify_contour(contour):
-    ensured_contour = []
+def simplify_contour(contour, merge_distance=CONTOUR_MERGE_DISTANCE):
+    points = np.asarray(contour).reshape(-1, 2)
+    is_left = np.ones(len(points), dtype=bool)
+    kept_indexes = []
 
-    for point in contour:
-        tuple_rem_point = point[0]
-        if not is_point_close_to_others(ensured_contour, tuple_rem_point, 200):
-            ensured_contour.append([tuple_rem_point[0], tuple_rem_point[1]])
+    # the first point left is never close to an earlier kept one, so it is kept and every later point close to it is merged
+    for index in range(len(points)):
+        if is_left[index]:
+            kept_indexes.append(index)
+            is_left[index + 1:] &= np.any(np.abs(points[index + 1:] - points[index]) > merge_distance, axis=1)
 
-    ndarray_contour = np.array(ensured_contour)
-    return ndarray_contour
+    return points[kept_indexes] if kept_indexes else np.array([])
 
 
 def is_video_playing(previous_frame, next_frame, contour):
-    num_contours_threshold = 100
-    img_diff = get_img_diff_between_frames(previous_frame, next_frame, contour)
-    contours = find_all_contours(img_diff, DetectionType.NORMAL)
-
-    return len(contours) > num_contours_threshold
+    return FrameContext(previous_frame, next_frame).is_video_playing(contour)
 
 
-def is_point_close_to_others(point_list, new_point, dist_tres):
-    for current_point in point_list:
-        if abs(current_point[0] - new_point[0]) <= dist_tres and abs(current_point[1] - new_point[1]) <= dist_tres:
-            return True
+def count_different_pixels(pixels, pixel):
+    # pixels are compared as a whole, the same way as with np.array_equal
+    pixel = np.asarray(pixel)
+    if pixels.shape[1:] != pixel.shape:
+        return len(pixels)
 
-    return False
+    return int(np.count_nonzero((pixels != pixel).reshape(len(pixels), -1).any(axis=1)))
 
 
-def get_no_camera_frame(frame, frame_width):
+def get_no_camera_frame(frame, camera_place):
     img = frame.copy()
-    cv2.rectangle(img, (1332, 0), (frame_width, 327), 255, -1)
+    paint_no_camera_place(img, camera_place, 255)
 
     return img
 
 
+def paint_no_camera_place(frame, camera_place, color):
+    cv2.rectangle(frame, camera_place[0], camera_place[1], color, -1)
+
+
 def is_video_initializing(frame, contour, grid_check_size=10):
     return is_contour_rectangular(contour) and is_contour_all_black(frame, contour, grid_check_size)
 
 
+def is_player_in_place(frame, contour, edge_offset, grid_check_size=10):
+    # the player is black inside, while the page around it is not, so a shifted or smaller rectangle does not match
+    if not is_video_initializing(frame, contour, grid_check_size):
+        return False
+
+    frame_height, frame_width = frame.shape[:2]
+    min_x, max_x, min_y, max_y = find_min_max_coordinates(contour)
+    sample_fractions = np.arange(1, PLAYER_EDGE_SAMPLES + 1) / (PLAYER_EDGE_SAMPLES + 1)
+    x_points = (min_x + sample_fractions * (max_x - min_x)).astype(int)
+    y_points = (min_y + sample_fractions * (max_y - min_y)).astype(int)
+
+    edges_pixels = []
+
+    # sides touching the border of the frame have nothing to sample
+    if min_y - edge_offset >= 0:
+        edges_pixels.append(frame[min_y - edge_offset, x_points])
+    if max_y + edge_offset < frame_height:
+        edges_pixels.append(frame[max_y + edge_offset, x_points])
+    if min_x - edge_offset >= 0:
+        edges_pixels.append(frame[y_points, min_x - edge_offset])
+    if max_x + edge_offset < frame_width:
+        edges_pixels.append(frame[y_points, max_x + edge_offset])
+
+    # one black point of every side is left for the mouse
+    return all(len(edge_pixels) - count_different_pixels(edge_pixels, BLACK) <= 1 for edge_pixels in edges_pixels)
+
+
 def is_contour_rectangular(contour):
     return len(contour) == 4
 
@@ -126,21 +414,19 @@ def is_contour_all_black(frame, contour, grid_size):
     contour_height = max_y - min_y
     x_spacing = int(contour_width / grid_size)
     y_spacing = int(contour_height / grid_size)
-    possible_mouse_encounters = 0
 
-    for ix in range(1, grid_size):
-        for iy in range(1, grid_size):
-            point_x = int(min_x + ix * x_spacing)
-            point_y = int(min_y + iy * y_spacing)
-            current_pixel = frame[point_y][point_x]
+    # the whole grid is sampled at once, one pixel which is not black is left for the mouse
+    points_x = (min_x + np.arange(1, grid_size) * x_spacing).astype(int)
+    points_y = (min_y + np.arange(1, grid_size) * y_spacing).astype(int)
+    grid_pixels = frame[np.ix_(points_y, points_x)]
+    possible_mouse_encounters = count_different_pixels(grid_pixels.reshape((-1,) + frame.shape[2:]), BLACK)
 
-            if not np.array_equal(current_pixel, BLACK):
-                possible_mouse_encounters += 1
+    return possible_mouse_encounters <= 1
 
-                if possible_mouse_encounters > 1:
-                    return False
 
-    return True
+def are_images_same(previous_img, next_img):
+    # the biggest difference of any channel is zero only for identical images, empty ones are not compared
+    return previous_img.size > 0 and cv2.norm(previous_img, next_img, cv2.NORM_INF) == 0
 
 
 def get_img_diff_between_frames(prev_frame, next_frame, contour=None):
@@ -151,30 +437,20 @@ def get_img_diff_between_frames(prev_frame, next_frame, contour=None):
     return img_diff
 
 
-def is_loading_popup_visible(prev_frame, next_frame, contour, img_diff_count):
-    diff_count = img_diff_count
-    img_diff = get_img_diff_between_frames(prev_frame, next_frame)
-
-    painted_popup_img = img_diff.copy()
-    paint_img_popup_place(painted_popup_img, contour, 0.1, 0.2)
-    painted_popup_img = get_contour_img(painted_popup_img, contour)
-    no_popup_contours = find_all_contours(painted_popup_img, DetectionType.NORMAL)
-
-    popup_img = get_contour_img(img_diff, contour, 0.1, 0.2)
-    popup_contours = find_all_contours(popup_img, DetectionType.SMOOTH)
-
-    is_visible = 0 < len(popup_contours) <= 4
-
-    if len(no_popup_contours) >= 35:
-        diff_count += 1
-
-    if diff_count == 3:
+def get_loading_popup_result(is_visible, has_no_popup_diff, img_diff_count, max_diff_count=MAX_NO_POPUP_DIFF_COUNT):
+    # differences outside of the popup place a few times in a row mean the player is not covered by a popup
+    diff_count = img_diff_count + 1 if has_no_popup_diff else img_diff_count
+    if diff_count == max_diff_count:
         return False, 0
 
     return is_visible, diff_count
 
 
-def paint_img_popup_place(frame, contour, width_offset=1.0, height_offset=1.0):
+def is_loading_popup_visible(prev_frame, next_frame, contour, img_diff_count):
+    return FrameContext(prev_frame, next_frame).is_loading_popup_visible(contour, img_diff_count)
+
+
+def paint_img_popup_place(frame, contour, width_offset=1.0, height_offset=1.0, origin=(0, 0), color=DEBUG_COLOR):
     min_x, max_x, min_y, max_y = find_min_max_coordinates(contour)
     half_height = int((max_y - min_y) / 2)
     half_width = int((max_x - min_x) / 2)
@@ -184,7 +460,8 @@ def paint_img_popup_place(frame, contour, width_offset=1.0, height_offset=1.0):
     new_min_x = min_x + half_width - int(width_offset * half_width)
     new_max_x = max_x - half_width + int(width_offset * half_width)
 
-    cv2.rectangle(frame, (new_min_x, new_min_y), (new_max_x, new_max_y), DEBUG_COLOR, -1)
+    origin_x, origin_y = origin
+    cv2.rectangle(frame, (new_min_x - origin_x, new_min_y - origin_y), (new_max_x - origin_x, new_max_y - origin_y), color, -1)
 
     # DEBUG
     # cv2.imshow("paint_img_popup_place", frame)
@@ -204,54 +481,28 @@ def get_contour_img(frame, contour, width_zoom=1.0, height_zoom=1.0):
 
 
 def are_pixels_in_row_same(frame, pixel, x_position, y_position, checks=3, spacing=100):
-    possible_mouse_encounters = 0
-
-    for ix in range(1, checks + 1):
-        right_x = x_position + int(spacing * ix)
-        left_x = x_position - int(spacing * ix)
-        right_pixel = frame[y_position][right_x]
-        left_pixel = frame[y_position][left_x]
+    offsets = (spacing * np.arange(1, checks + 1)).astype(int)
+    row_pixels = frame[y_position, np.concatenate([x_position + offsets, x_position - offsets])]
 
-        if not np.array_equal(pixel, right_pixel):
-            possible_mouse_encounters += 1
-
-        if not np.array_equal(pixel, left_pixel):
-            possible_mouse_encounters += 1
-
-        # DEBUG
-        # cv2.circle(frame, [right_x, y_position], 10, DEBUG_COLOR, 1)
-        # cv2.circle(frame, [left_x, y_position], 10, DEBUG_COLOR, 1)
-        # cv2.imshow("are_pixels_in_row_same", frame)
-
-        if possible_mouse_encounters > 1:
-            return False
+    # DEBUG
+    # for point_x in np.concatenate([x_position + offsets, x_position - offsets]):
+    #     cv2.circle(frame, [int(point_x), y_position], 10, DEBUG_COLOR, 1)
+    # cv2.imshow("are_pixels_in_row_same", frame)
 
-    return True
+    possible_mouse_encounters = count_different_pixels(row_pixels, pixel)
+    return possible_mouse_encounters <= 1
 
 
 def find_min_max_coordinates(contour):
-    min_x = float('inf')
-    max_x = 0
-    min_y = float('inf')
-    max_y = 0
-
-    for point in contour:
-        current_x = point[0]
-        current_y = point[1]
+    points = np.asarray(contour).reshape(-1, 2)
+    if len(points) == 0:
+        return float('inf'), 0, float('inf'), 0
 
-        if current_x < min_x:
-            min_x = current_x
+    min_x, min_y = points.min(axis=0)
+    max_x, max_y = points.max(axis=0)
 
-        if current_x > max_x:
-            max_x = current_x
-
-        if current_y < min_y:
-            min_y = current_y
-
-        if current_y > max_y:
-            max_y = current_y
-
-    return min_x, max_x, min_y, max_y
+    # maximums start from 0, the same way as when points were walked one by one
+    return min_x, max(max_x, 0), min_y, max(max_y, 0)
 
 
 def save_video_event(images, video_path, resolution):
@@ -274,16 +525,19 @@ def is_video_back_in_place(frame, contour):
 # !Not Implemented!
 def find_bottom_scroll_bar_point(frame, height, width):
     screen_to_scroll_bar_spacing = 9
+    point_x = width - screen_to_scroll_bar_spacing
 
-    for iy in range(height - 2, 1, -1):
-        point_x = width - screen_to_scroll_bar_spacing
-        previous_point = frame[iy - 1][point_x]
-        next_point = frame[iy][point_x]
-        if not np.array_equal(previous_point, next_point):
-            # DEBUG
-            # cv2.circle(frame, [point_x, iy], 10, DEBUG_COLOR, -1)
-            # cv2.imshow("LOL", frame)
+    # rows from 1 to height - 2 are compared with the ones above them, the lowest change is the bottom of the scroll bar
+    column = frame[1:height - 1, point_x]
+    changed_rows = np.flatnonzero((column[1:] != column[:-1]).reshape(len(column) - 1, -1).any(axis=1))
 
-            return iy
+    if len(changed_rows) == 0:
+        return float('inf')
+
+    iy = int(changed_rows[-1]) + 2
+
+    # DEBUG
+    # cv2.circle(frame, [point_x, iy], 10, DEBUG_COLOR, -1)
+    # cv2.imshow("LOL", frame)
 
-    return float('inf')
+    return iy
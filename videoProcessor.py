@@ -0,0 +1,304 @@
+import os
+import time
+from dataclasses import dataclass, field
+
+import cv2
+
+import clipExtractor
+import videoExtensions
+from analysisCheckpoint import AnalysisCheckpoint, get_checkpoint_path, load_checkpoint, remove_checkpoint, \
+    save_checkpoint
+from clipEncoder import ClipEncoder
+from eventPrinter import EventType
+from eventSinks import MemoryEventSink
+from featureTrace import FeatureTraceRecorder, get_trace_path
+from frameHistory import CompressedFrameHistory, FrameIndexHistory
+from pipelinedCapture import PipelinedVideoCapture
+from playerCalibration import PlayerCalibration
+from profiler import ProfiledVideoCapture, Profiler
+from videoEventWriter import VideoEventWriter
+from videoStateMachine import VideoStateMachine
+
+
+@dataclass
+class ProcessingOptions:
+    adaptive_stride: bool = False
+    clip_encoder_workers: int = 0
+    clip_encoder_queue_size: int = 4
+    history_format: str = "raw"
+    history_quality: int = 90
+    history_scale: float = 1.0
+    history_memory_budget: int = 0
+    lazy_clips: bool = False
+    skipped_clip_event_types: tuple = ()
+    profile: bool = False
+    analysis_scale: float = 1.0
+    player_search_scale: float = 1.0
+    player_calibration_path: str = None
+    checkpoint_interval: int = 0
+    resume: bool = False
+    decode_queue_size: int = 0
+    change_gating: bool = False
+    record_features: bool = False
+    detector_processes: int = 0
+    merge_clips: bool = False
+
+
+@dataclass
+class VideoSummary:
+    video_path: str
+    video_name: str
+    frames_count: int
+    wall_time: float
+    events_count: int
+    history_memory_used: int = 0
+    events: list = field(default_factory=list)
+    is_cached: bool = False
+
+    def get_frames_per_second(self):
+        return self.frames_count / self.wall_time if self.wall_time > 0 else 0.0
+
+
+def initialize_worker():
+    # work is already spread over cores, so OpenCV should not spawn its own thread pool in every worker
+    cv2.setNumThreads(1)
+
+
+def get_video_name(video_path):
+    return os.path.basename(video_path)[0:-4]
+
+
+def configure_event_writer(event_writer, options, first_frame_index=0):
+    event_writer.skipped_event_types = tuple(EventType(event_type) for event_type in options.skipped_clip_event_types)
+
+    if options.lazy_clips:
+        event_writer.frame_history = FrameIndexHistory(event_writer.BUF_SIZE, event_writer.video_resolution, first_frame_index)
+        event_writer.clip_windows = []
+    elif options.history_format != "raw":
+        event_writer.frame_history = CompressedFrameHistory(event_writer.BUF_SIZE, event_writer.video_resolution,
+                                                            "." + options.history_format, options.history_quality,
+                                                            options.history_scale, options.history_memory_budget)
+
+    if options.merge_clips:
+        event_writer.clip_segments = []
+        event_writer.pending_clips = []
+
+    if options.clip_encoder_workers > 0:
+        event_writer.clip_encoder = ClipEncoder(options.clip_encoder_workers, options.clip_encoder_queue_size)
+
+
+def configure_player_search(stateMachine, options):
+    stateMachine.player_search_scale = options.player_search_scale
+
+    if options.player_calibration_path:
+        stateMachine.player_calibration = PlayerCalibration(options.player_calibration_path)
+
+
+def configure_change_gating(stateMachine, options):
+    if options.change_gating:
+        stateMachine.change_gate = videoExtensions.ChangeGate()
+
+
+def create_profiler(options, stateMachine):
+    if not options.profile:
+        return None
+
+    profiler = Profiler()
+    stateMachine.enable_profiling(profiler)
+    return profiler
+
+
+def save_profile(profiler, video_name, wall_time):
+    if profiler is not None:
+        profiler.save("out\\" + video_name + "\\profile.json", wall_time)
+        profiler.print_summary(video_name, wall_time)
+
+
+def materialise_event_clips(event_writer, video_path, profiler=None):
+    if event_writer.clip_windows:
+        start_time = time.perf_counter()
+        clipExtractor.extract_event_clips(video_path, event_writer.clip_windows, event_writer.video_resolution)
+
+        if profiler is not None:
+            profiler.add("clip_extraction", time.perf_counter() - start_time)
+
+
+def print_clip_encoding_report(event_writer):
+    if event_writer.clip_encoder is not None:
+        event_writer.clip_encoder.print_report()
+
+
+def print_change_gating_report(stateMachine):
+    if stateMachine.change_gate is not None:
+        stateMachine.change_gate.print_report()
+
+
+def open_events_file(video_name, checkpoint=None):
+    events_path = "out\\" + video_name + "\\events.txt"
+    if checkpoint is None:
+        return open(events_path, "w+")
+
+    # events written after the checkpoint are detected again, so they are cut off
+    text_file = open(events_path, "r+")
+    text_file.truncate(checkpoint.events_file_size)
+    text_file.seek(checkpoint.events_file_size)
+    return text_file
+
+
+def create_checkpoint(stateMachine, event_records, text_file, frames_count):
+    event_writer = stateMachine.event_writer
+
+    # clips of events before the checkpoint are not written again after resuming
+    if event_writer.clip_encoder is not None:
+        event_writer.clip_encoder.flush()
+
+    text_file.flush()
+    machine_state = {**stateMachine.get_dynamic_state(), "new_event_id": stateMachine.new_event_id}
+    return AnalysisCheckpoint(frames_count - 1, frames_count, text_file.tell(), machine_state, list(event_records.events),
+                              list(event_writer.clip_windows or []), list(event_writer.clip_segments or []))
+
+
+def resume_from_checkpoint(video, stateMachine, event_records, checkpoint, first_frame_index):
+    # clip history is refilled with frames before the checkpoint, so clips match an uninterrupted run
+    event_writer = stateMachine.event_writer
+    video.set(cv2.CAP_PROP_POS_FRAMES, first_frame_index)
+    is_read, previous_frame = video.read(event_writer.get_free_frame_slot())
+
+    for frame_index in range(first_frame_index, checkpoint.frame_index):
+        if not is_read:
+            break
+
+        event_writer.receive_frame(previous_frame)
+        is_read, previous_frame = video.read(event_writer.get_free_frame_slot(previous_frame))
+
+    stateMachine.set_dynamic_state(checkpoint.machine_state)
+    event_records.events = list(checkpoint.events)
+    if event_writer.clip_windows is not None:
+        event_writer.clip_windows.extend(checkpoint.clip_windows)
+    if event_writer.clip_segments is not None:
+        event_writer.clip_segments.extend(checkpoint.clip_segments)
+
+    return is_read, previous_frame
+
+
+def process_video(video_path, options=None):
+    options = options or ProcessingOptions()
+    video_name = get_video_name(video_path)
+    print("Work on " + video_name + " has started... Please don't close the application.")
+    start_time = time.perf_counter()
+
+    # video reading
+    video = cv2.VideoCapture(video_path)
+    WIDTH = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    HEIGHT = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    # analysis killed before the end continues from its last checkpoint
+    os.makedirs("out\\" + video_name, exist_ok=True)
+    checkpoint_path = get_checkpoint_path(video_name)
+    checkpoint = load_checkpoint(checkpoint_path) if options.resume else None
+    if checkpoint is not None:
+        print("Resuming " + video_name + " from frame " + str(checkpoint.frame_index) + ".")
+
+    # initializing state machine
+    text_file = open_events_file(video_name, checkpoint)
+    event_records = MemoryEventSink()
+    stateMachine = VideoStateMachine()
+    stateMachine.initialize(WIDTH, HEIGHT, video_name, text_file, event_sinks=[event_records],
+                            analysis_scale=options.analysis_scale)
+    configure_player_search(stateMachine, options)
+    configure_change_gating(stateMachine, options)
+
+    # frames are decoded straight into the clip history of the event writer
+    event_writer = stateMachine.event_writer
+    first_frame_index = max(0, checkpoint.frame_index - VideoEventWriter.BUF_SIZE) if checkpoint is not None else 0
+    configure_event_writer(event_writer, options, first_frame_index)
+    profiler = create_profiler(options, stateMachine)
+    if profiler is not None:
+        video = ProfiledVideoCapture(video, profiler)
+
+    if checkpoint is None:
+        ret, previous_frame = video.read(event_writer.get_free_frame_slot())
+        frames_count = 1 if ret else 0
+    else:
+        ret, previous_frame = resume_from_checkpoint(video, stateMachine, event_records, checkpoint, first_frame_index)
+        frames_count = checkpoint.frames_count
+
+    # sampled frames are grabbed and sought on the analysis thread, so strides keep decoding there
+    pipeline = None
+    if options.decode_queue_size > 0 and not options.adaptive_stride:
+        pipeline = video = PipelinedVideoCapture(video, options.decode_queue_size)
+
+    checkpoint_frames_count = frames_count
+
+    # a trace describes every pair of frames from the start of the video
+    trace_recorder = None
+    if options.record_features and not options.adaptive_stride and checkpoint is None:
+        trace_recorder = FeatureTraceRecorder(get_trace_path(video_name))
+
+    while video.isOpened():
+        if options.adaptive_stride and stateMachine.get_discarded_frames_count() > 0:
+            # analysis of skipped frames is discarded anyway, so they are not decoded
+            if not video.grab():
+                break
+
+            frames_count += 1
+            stateMachine.run_current_state(previous_frame, None, video.get(cv2.CAP_PROP_POS_MSEC))
+            continue
+
+        stride = stateMachine.get_frame_stride() if options.adaptive_stride else 1
+        if stride > 1:
+            frame_position = int(video.get(cv2.CAP_PROP_POS_FRAMES))
+            is_grabbed = all(video.grab() for i in range(stride - 1))
+            is_read, current_frame = video.read(event_writer.get_free_frame_slot(previous_frame)) if is_grabbed else (False, None)
+
+            if is_read and stateMachine.try_run_sparse_state(previous_frame, current_frame,
+                                                             video.get(cv2.CAP_PROP_POS_MSEC), stride):
+                frames_count += stride
+                previous_frame = current_frame
+                continue
+
+            # something happened between sampled frames, so they are analysed again one by one
+            video.set(cv2.CAP_PROP_POS_FRAMES, frame_position)
+            stateMachine.require_dense_frames()
+
+        is_read, current_frame = video.read(event_writer.get_free_frame_slot(previous_frame))
+
+        if is_read:
+            frames_count += 1
+            current_time = video.get(cv2.CAP_PROP_POS_MSEC)
+            stateMachine.run_current_state(previous_frame, current_frame, current_time)
+            if trace_recorder is not None:
+                trace_recorder.add_frame(stateMachine)
+
+            # enable both lines for activating frame debugging
+            #if cv2.waitKey(frame_reading_speed) == ord('q'):
+                #break
+
+            previous_frame = current_frame
+
+            # delayed clips and unwritten segments can not be saved in a checkpoint, so it waits until they are written
+            if options.checkpoint_interval > 0 and frames_count - checkpoint_frames_count >= options.checkpoint_interval \
+                    and not event_writer.has_pending_clips():
+                save_checkpoint(create_checkpoint(stateMachine, event_records, text_file, frames_count), checkpoint_path)
+                checkpoint_frames_count = frames_count
+        else:
+            break
+
+    stateMachine.save_text_file()
+    video.release()
+    if trace_recorder is not None:
+        trace_recorder.save(stateMachine)
+
+    materialise_event_clips(event_writer, video_path, profiler)
+    print_clip_encoding_report(event_writer)
+    print_change_gating_report(stateMachine)
+    if pipeline is not None:
+        pipeline.print_report()
+
+    remove_checkpoint(checkpoint_path)
+
+    summary = VideoSummary(video_path, video_name, frames_count, time.perf_counter() - start_time, stateMachine.new_event_id - 1,
+                           event_writer.get_history_memory_used(), event_records.events)
+    save_profile(profiler, video_name, summary.wall_time)
+    print("Work on " + video_name + " has ended.")
+    return summary
@@ -1,7 +1,11 @@
 from enum import Enum
 
+import numpy as np
+
 import eventPrinter
 import videoExtensions
+from eventSinks import MultiEventSink, TextEventSink
+from frameLayout import FrameLayout
 from videoEventWriter import VideoEventWriter
 
 
@@ -18,6 +22,7 @@ class VideoStateMachine:
     FRAME_WIDTH = 0
     FRAME_HEIGHT = 0
     SCREEN_CONTOUR = None
+    layout = None
 
     MAX_FRAME_SKIP_COUNT = 5
     MAX_TIMES_LOADING_POPUP_VISIBLE = 15
@@ -26,8 +31,21 @@ class VideoStateMachine:
     MAX_SCROLL_BAR_COUNT = 5
     MAX_COME_BACK_COUNT = 20
 
+    # adaptive sampling, states not listed here are always analysed frame by frame
+    FRAME_STRIDES = {State.PLAYING_VIDEO: 8}
+    DENSE_FRAMES_AFTER_CHANGE = 30
+
+    # player localisation, the search scale is relative to frames given to detectors
+    CALIBRATED_PLAYER_SEARCH_INTERVAL = 15
+    player_search_scale = 1.0
+    player_calibration = None
+    frames_since_player_search = 0
+
+    # detectors of regions unchanged between frames are skipped when a gate is set
+    change_gate = None
+
     # event writer
-    text_file = None
+    event_sink = None
     event_writer = None
     new_event_id = 0
 
@@ -38,6 +56,7 @@ class VideoStateMachine:
 
     previous_frame = None
     next_frame = None
+    frame_context = None
 
     current_frames_skip_count = 0
     times_loading_popup_visible = 0
@@ -47,6 +66,7 @@ class VideoStateMachine:
     current_come_back_count = 0
 
     current_img_diff_count = 0
+    dense_frames_left = 0
 
     # video parameters
     had_video_once = False
@@ -64,21 +84,72 @@ class VideoStateMachine:
     def __init__(self):
         self.current_state = State.LOOKING_FOR_VIDEO
 
-    def initialize(self, width, height, file_name):
+    def initialize(self, width, height, file_name, text_file=None, event_writer_name=None, event_sinks=(),
+                   analysis_scale=1.0, event_writer=None):
         self.FRAME_WIDTH = width
         self.FRAME_HEIGHT = height
-        self.SCREEN_CONTOUR = [(0, 0), (0, height), (width, 0), (width, height)]
-        self.event_writer = VideoEventWriter(file_name, (width, height))
-        self.text_file = open("out\\" + file_name + "\\events.txt", "w+")
+        # detectors work on frames scaled by the layout, so contours are kept in its coordinates
+        self.layout = FrameLayout((width, height), analysis_scale)
+        self.SCREEN_CONTOUR = self.layout.screen_contour
+        # a given writer replaces the one writing clips to out\<file_name>
+        self.event_writer = event_writer or VideoEventWriter(event_writer_name or file_name, (width, height))
+        text_file = text_file or open("out\\" + file_name + "\\events.txt", "w+")
+        self.event_sink = MultiEventSink([TextEventSink(text_file)] + list(event_sinks))
         self.new_event_id = 1
 
-    def run_current_state(self, previous_frame, next_frame, time):
+    def get_dynamic_state(self):
+        return {
+            "previous_state": self.previous_state.name if self.previous_state is not None else None,
+            "current_state": self.current_state.name,
+            "current_frames_skip_count": self.current_frames_skip_count,
+            "times_loading_popup_visible": self.times_loading_popup_visible,
+            "times_loading_popup_not_visible": self.times_loading_popup_not_visible,
+            "current_scroll_bar_count": self.current_scroll_bar_count,
+            "current_come_back_count": self.current_come_back_count,
+            "current_img_diff_count": self.current_img_diff_count,
+            "had_video_once": self.had_video_once,
+            "skip_frame": self.skip_frame,
+            "has_lost_video": self.has_lost_video,
+            "is_full_screen": self.is_full_screen,
+            "possible_loading_popup_appear_time": self.possible_loading_popup_appear_time,
+            "possible_loading_popup_disappear_time": self.possible_loading_popup_disappear_time,
+            "video_contour": self.video_contour.tolist() if self.video_contour is not None else None,
+            "scroll_bar_bottom_edge": self.scroll_bar_bottom_edge,
+        }
+
+    def set_dynamic_state(self, dynamic_state):
+        for field_name, value in dynamic_state.items():
+            setattr(self, field_name, value)
+
+        self.previous_state = State[dynamic_state["previous_state"]] if dynamic_state["previous_state"] else None
+        self.current_state = State[dynamic_state["current_state"]]
+
+        if dynamic_state["video_contour"] is not None:
+            self.video_contour = np.array(dynamic_state["video_contour"])
+
+    def enable_profiling(self, profiler):
+        # timed wrappers are set on this instance only, so nothing is measured while profiling is off
+        for method_name in [name for name in dir(self) if name.startswith("check_")]:
+            setattr(self, method_name, profiler.wrap("check." + method_name, getattr(self, method_name)))
+
+        # shared frame differences are measured within the first check which needs them
+        self.run_current_state = profiler.wrap(lambda: "state." + self.current_state.name, self.run_current_state)
+        self.try_run_sparse_state = profiler.wrap(lambda: "sparse_state." + self.current_state.name,
+                                                  self.try_run_sparse_state)
+        self.event_writer.enable_profiling(profiler)
+
+    def run_current_state(self, previous_frame, next_frame, time, frame_context=None):
         self.previous_frame = previous_frame
         self.next_frame = next_frame
         self.current_time = time
+        self.frame_context = frame_context or videoExtensions.FrameContext(previous_frame, next_frame, self.layout,
+                                                                           self.frame_context, change_gate=self.change_gate)
 
         self.event_writer.receive_frame(previous_frame)
 
+        if self.dense_frames_left > 0:
+            self.dense_frames_left -= 1
+
         self.try_remove_frame_skip()
         if self.skip_frame:
             return
@@ -95,6 +166,59 @@ class VideoStateMachine:
             case State.SITE_CHANGED:
                 self.look_to_start_state()
 
+    def get_frame_stride(self):
+        if self.dense_frames_left > 0 or not self.is_state_stable():
+            return 1
+
+        return self.FRAME_STRIDES.get(self.current_state, 1)
+
+    def get_discarded_frames_count(self):
+        # the last skipped frame is still needed as the previous frame of the next analysed one
+        if not self.skip_frame:
+            return 0
+
+        return max(0, self.MAX_FRAME_SKIP_COUNT - self.current_frames_skip_count - 2)
+
+    def is_state_stable(self):
+        return not self.skip_frame and self.times_loading_popup_visible == 0\
+            and self.times_loading_popup_not_visible == 0
+
+    def require_dense_frames(self):
+        self.dense_frames_left = self.DENSE_FRAMES_AFTER_CHANGE
+
+    def try_run_sparse_state(self, previous_frame, next_frame, time, stride):
+        frame_context = videoExtensions.FrameContext(previous_frame, next_frame, self.layout, self.frame_context,
+                                                     change_gate=self.change_gate)
+        if self.has_detected_change(frame_context):
+            return False
+
+        # nothing changed between sampled frames, so frames in between are represented by the previous one
+        for i in range(stride):
+            self.event_writer.receive_frame(previous_frame)
+
+        self.previous_frame = previous_frame
+        self.next_frame = next_frame
+        self.current_time = time
+        self.frame_context = frame_context
+        return True
+
+    def has_detected_change(self, frame_context):
+        if frame_context.is_full_screen_toggled():
+            return True
+
+        if not self.is_full_screen and frame_context.has_url_bar_changed():
+            return True
+
+        if self.current_state == State.PLAYING_VIDEO:
+            is_visible, img_diff_count = frame_context.is_loading_popup_visible(self.get_current_video_contour(),
+                                                                                self.current_img_diff_count)
+            if not is_visible:
+                self.current_img_diff_count = img_diff_count
+
+            return is_visible
+
+        return True
+
     def try_remove_frame_skip(self):
         if self.skip_frame:
             self.current_frames_skip_count += 1
@@ -107,9 +231,10 @@ class VideoStateMachine:
         return self.SCREEN_CONTOUR if self.is_full_screen else self.video_contour
 
     def get_no_camera_frame(self, frame):
-        return videoExtensions.get_no_camera_frame(frame, self.FRAME_WIDTH)
+        return videoExtensions.get_no_camera_frame(frame, self.layout.camera_place)
 
     def change_state(self, state):
+        self.dense_frames_left = self.DENSE_FRAMES_AFTER_CHANGE
         self.current_img_diff_count = 0
         self.previous_state = self.current_state
         self.current_state = state
@@ -141,49 +266,64 @@ class VideoStateMachine:
             self.check_for_loading_popup(True)
 
     def try_get_video_contour(self):
-        if not self.had_video_once:
-            biggest_contour = videoExtensions.find_biggest_contour(self.previous_frame)
-            self.video_contour = videoExtensions.simplify_contour(biggest_contour)
+        if self.had_video_once:
+            return
+
+        calibrated_contour = self.player_calibration.get_contour(self.layout) if self.player_calibration else None
+        if calibrated_contour is not None:
+            if self.frame_context.is_player_in_place(calibrated_contour):
+                self.video_contour = calibrated_contour
+                return
+
+            # the player usually shows up where it was calibrated, so the page is searched only from time to time
+            self.frames_since_player_search += 1
+            if self.video_contour is not None and self.frames_since_player_search < self.CALIBRATED_PLAYER_SEARCH_INTERVAL:
+                return
+
+        self.frames_since_player_search = 0
+        biggest_contour = self.frame_context.find_biggest_contour(self.player_search_scale)
+        self.video_contour = videoExtensions.simplify_contour(biggest_contour,
+                                                              self.layout.scale_length(videoExtensions.CONTOUR_MERGE_DISTANCE))
 
     def check_is_video_initializing(self):
-        if videoExtensions.is_video_initializing(self.previous_frame, self.video_contour):
+        if self.frame_context.is_video_initializing(self.video_contour):
             self.had_video_once = True
-            eventPrinter.print_video_start_initializing(self.text_file, self.current_time, str(self.new_event_id))
-            self.event_writer.request_event_write(str(self.new_event_id))
+            if self.player_calibration is not None:
+                self.player_calibration.set_contour(self.layout, self.video_contour)
+
+            eventPrinter.print_video_start_initializing(self.event_sink, self.current_time, str(self.new_event_id))
+            self.event_writer.request_event_write(str(self.new_event_id), event_type=eventPrinter.EventType.VIDEO_START_INITIALIZING)
             self.new_event_id += 1
             self.skip_frame = True
             self.change_state(State.LOADING_VIDEO)
 
     def check_full_screen_toggle(self):
-        if videoExtensions.is_full_screen_toggled(self.previous_frame, self.next_frame):
+        if self.frame_context.is_full_screen_toggled():
             self.skip_frame = True
             self.is_full_screen = not self.is_full_screen
-            eventPrinter.print_full_screen_toggle(self.text_file, self.current_time, self.is_full_screen, str(self.new_event_id))
-            self.event_writer.request_event_write(str(self.new_event_id))
+            eventPrinter.print_full_screen_toggle(self.event_sink, self.current_time, self.is_full_screen, str(self.new_event_id))
+            self.event_writer.request_event_write(str(self.new_event_id), event_type=eventPrinter.EventType.FULL_SCREEN_TOGGLE)
             self.new_event_id += 1
 
     def check_for_url_change(self):
         if not self.is_full_screen and not self.skip_frame\
-                and videoExtensions.has_url_bar_changed(self.previous_frame, self.next_frame):
-            eventPrinter.print_url_changed(self.text_file, self.current_time, str(self.new_event_id))
-            self.event_writer.request_event_write(str(self.new_event_id))
+                and self.frame_context.has_url_bar_changed():
+            eventPrinter.print_url_changed(self.event_sink, self.current_time, str(self.new_event_id))
+            self.event_writer.request_event_write(str(self.new_event_id), event_type=eventPrinter.EventType.URL_CHANGED)
             self.new_event_id += 1
             self.skip_frame = True
             self.change_state(State.SITE_CHANGED)
 
     def check_is_video_starting(self):
-        if videoExtensions.is_video_playing(self.previous_frame, self.next_frame, self.get_current_video_contour()):
-            eventPrinter.print_video_start_playing(self.text_file, self.current_time, str(self.new_event_id))
-            self.event_writer.request_event_write(str(self.new_event_id))
+        if self.frame_context.is_video_playing(self.get_current_video_contour()):
+            eventPrinter.print_video_start_playing(self.event_sink, self.current_time, str(self.new_event_id))
+            self.event_writer.request_event_write(str(self.new_event_id), event_type=eventPrinter.EventType.VIDEO_START_PLAYING)
             self.new_event_id += 1
             self.change_state(State.PLAYING_VIDEO)
 
     def check_is_video_continuing(self):
-        is_visible, img_diffs_count = videoExtensions.is_loading_popup_visible(
-            self.get_no_camera_frame(self.previous_frame),
-            self.get_no_camera_frame(self.next_frame),
-            self.get_current_video_contour(),
-            self.current_img_diff_count)
+        is_visible, img_diffs_count = self.frame_context.is_loading_popup_visible(self.get_current_video_contour(),
+                                                                                 self.current_img_diff_count)
 
         if not is_visible or img_diffs_count > self.current_img_diff_count:
             if self.possible_loading_popup_disappear_time == 0:
@@ -193,8 +333,8 @@ class VideoStateMachine:
             self.current_img_diff_count = img_diffs_count
 
             if self.times_loading_popup_not_visible >= self.MAX_TIMES_LOADING_POPUP_NOT_VISIBLE:
-                eventPrinter.print_video_resumed(self.text_file, self.possible_loading_popup_disappear_time, str(self.new_event_id))
-                self.event_writer.request_event_write(str(self.new_event_id), 10)
+                eventPrinter.print_video_resumed(self.event_sink, self.possible_loading_popup_disappear_time, str(self.new_event_id))
+                self.event_writer.request_event_write(str(self.new_event_id), 10, event_type=eventPrinter.EventType.VIDEO_RESUMED)
                 self.new_event_id += 1
                 self.possible_loading_popup_disappear_time = 0
                 self.times_loading_popup_not_visible = 0
@@ -205,13 +345,11 @@ class VideoStateMachine:
             self.times_loading_popup_not_visible = 0
 
     def check_for_loading_popup(self, black_background_check=False):
-        if black_background_check and not videoExtensions.is_video_initializing(self.previous_frame, self.video_contour, 4):
+        if black_background_check and not self.frame_context.is_video_initializing(self.video_contour, 4):
             return
 
-        is_visible, img_diff_count = videoExtensions.is_loading_popup_visible(self.get_no_camera_frame(self.previous_frame),
-                                                                              self.get_no_camera_frame(self.next_frame),
-                                                                              self.get_current_video_contour(),
-                                                                              self.current_img_diff_count)
+        is_visible, img_diff_count = self.frame_context.is_loading_popup_visible(self.get_current_video_contour(),
+                                                                                self.current_img_diff_count)
         self.current_img_diff_count = img_diff_count
 
         if is_visible:
@@ -225,12 +363,12 @@ class VideoStateMachine:
                 self.current_img_diff_count = 0
 
                 if self.current_state != State.PLAYING_VIDEO:
-                    eventPrinter.print_video_start_playing(self.text_file, self.possible_loading_popup_appear_time, str(self.new_event_id))
-                    self.event_writer.request_instant_event_write(str(self.new_event_id), 50)
+                    eventPrinter.print_video_start_playing(self.event_sink, self.possible_loading_popup_appear_time, str(self.new_event_id))
+                    self.event_writer.request_instant_event_write(str(self.new_event_id), 50, event_type=eventPrinter.EventType.VIDEO_START_PLAYING)
                     self.new_event_id += 1
 
-                eventPrinter.print_video_connection_interruption(self.text_file, self.possible_loading_popup_appear_time, str(self.new_event_id))
-                self.event_writer.request_instant_event_write(str(self.new_event_id), 50)
+                eventPrinter.print_video_connection_interruption(self.event_sink, self.possible_loading_popup_appear_time, str(self.new_event_id))
+                self.event_writer.request_instant_event_write(str(self.new_event_id), 50, event_type=eventPrinter.EventType.VIDEO_CONNECTION_INTERRUPTION)
                 self.new_event_id += 1
                 self.change_state(State.PAUSED_VIDEO)
                 self.possible_loading_popup_appear_time = 0
@@ -239,36 +377,39 @@ class VideoStateMachine:
             self.times_loading_popup_visible = 0
 
     def save_text_file(self):
-        self.text_file.close()
+        self.event_writer.flush()
+        self.event_sink.close()
 
 # !Not implemented!
     def check_scroll_bar(self):
         if self.is_full_screen or self.skip_frame:
             return
 
-        current_scroll_bar_bottom_edge = videoExtensions.find_bottom_scroll_bar_point(self.previous_frame,
-                                                                                      self.FRAME_HEIGHT,
-                                                                                      self.FRAME_WIDTH)
+        analysis_width, analysis_height = self.layout.analysis_resolution
+        current_scroll_bar_bottom_edge = videoExtensions.find_bottom_scroll_bar_point(self.frame_context.get_previous_analysis_frame(),
+                                                                                      analysis_height,
+                                                                                      analysis_width)
         if self.scroll_bar_bottom_edge == float('inf'):
             self.scroll_bar_bottom_edge = current_scroll_bar_bottom_edge
 
         if self.scroll_bar_bottom_edge != current_scroll_bar_bottom_edge:
             self.scroll_bar_bottom_edge = float('inf')
-            eventPrinter.print_video_lost(self.text_file, self.current_time, str(self.new_event_id))
-            self.event_writer.request_event_write(str(self.new_event_id))
+            eventPrinter.print_video_lost(self.event_sink, self.current_time, str(self.new_event_id))
+            self.event_writer.request_event_write(str(self.new_event_id), event_type=eventPrinter.EventType.VIDEO_LOST)
             self.new_event_id += 1
             self.has_lost_video = True
 
 # !Not implemented!
     def has_video_came_back(self):
         if not self.skip_frame and \
-                videoExtensions.is_video_back_in_place(self.get_no_camera_frame(self.previous_frame), self.video_contour):
+                videoExtensions.is_video_back_in_place(self.get_no_camera_frame(self.frame_context.get_previous_analysis_frame()),
+                                                       self.video_contour):
             self.current_come_back_count += 1
 
             if self.current_come_back_count >= self.MAX_COME_BACK_COUNT:
                 self.has_lost_video = False
-                eventPrinter.print_video_come_back(self.text_file, self.current_time, str(self.new_event_id))
-                self.event_writer.request_event_write(str(self.new_event_id))
+                eventPrinter.print_video_come_back(self.event_sink, self.current_time, str(self.new_event_id))
+                self.event_writer.request_event_write(str(self.new_event_id), event_type=eventPrinter.EventType.VIDEO_COME_BACK)
                 self.new_event_id += 1
                 self.change_state(self.previous_state)
 